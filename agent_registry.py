@@ -0,0 +1,98 @@
+from datetime import datetime
+import hashlib
+import json
+import os
+
+from azure.core.exceptions import ResourceNotFoundError
+
+
+DEFAULT_REGISTRY_PATH = ".agent_registry.json"
+
+
+class AgentRegistry:
+    """A local store that maps agent definition fingerprints to existing remote agent IDs.
+
+    Agent definitions are reused across runs as long as their name, model, description, instructions,
+    temperature and tools are unchanged. Definitions are scoped to the project endpoint they were created in.
+    """
+
+    def __init__(self, scope: str, path: str = DEFAULT_REGISTRY_PATH):
+        self.scope = scope
+        self.path = path
+        self.entries: dict[str, dict] = self._load()
+
+    def _load(self) -> dict[str, dict]:
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as file:
+                return json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"**Agent Registry**: Ignoring unreadable registry at {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """Persist the registry, replacing the previous file atomically."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(self.entries, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def fingerprint(self, definition: dict, tools: list[str]) -> str:
+        """Hash everything that makes up an agent definition."""
+        payload = {
+            "scope": self.scope,
+            "name": definition.get("name"),
+            "model": definition.get("model"),
+            "description": definition.get("description"),
+            "instructions": definition.get("instructions"),
+            "temperature": definition.get("temperature"),
+            "tools": sorted(tools),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def get_or_create(self, client, definition: dict, tools: list[str]):
+        """Return the remote agent matching the definition, creating and registering it if there is none."""
+        fingerprint = self.fingerprint(definition, tools)
+        entry = self.entries.get(fingerprint)
+        if entry:
+            try:
+                agent = await client.agents.get_agent(agent_id=entry["agent_id"])
+                entry["last_used"] = datetime.now().isoformat()
+                return agent
+            except ResourceNotFoundError:
+                # The agent was deleted remotely, so the entry is stale
+                del self.entries[fingerprint]
+
+        agent = await client.agents.create_agent(**definition)
+        self.entries[fingerprint] = {
+            "agent_id": agent.id,
+            "name": agent.name,
+            "scope": self.scope,
+            "created": datetime.now().isoformat(),
+            "last_used": datetime.now().isoformat(),
+        }
+        return agent
+
+    async def gc(self, client, keep: set[str]) -> list[str]:
+        """Delete all remote agents of this scope whose fingerprint is not in keep and remove them from the registry.
+
+        Returns the names of the pruned agents.
+        """
+        stale = {
+            fingerprint: entry for fingerprint, entry in self.entries.items()
+            if entry.get("scope") == self.scope and fingerprint not in keep
+        }
+        pruned = []
+        for fingerprint, entry in stale.items():
+            try:
+                await client.agents.delete_agent(agent_id=entry["agent_id"])
+            except ResourceNotFoundError:
+                pass
+            except Exception as e:
+                print(f"**Agent Registry**: Failed to delete agent {entry['name']} ({entry['agent_id']}): {e}")
+                continue
+            del self.entries[fingerprint]
+            pruned.append(f"{entry['name']} ({entry['agent_id']})")
+        self.save()
+        return pruned
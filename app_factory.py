@@ -1,247 +1,798 @@
+from __future__ import annotations
+
+import argparse
 import asyncio
+from collections.abc import Callable
 from datetime import datetime
+import io
 import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from model_tiers import DEFAULT_SMALL_MODEL_ROLES, ModelTiers
+from startup_profile import StartupProfile
 
-from azure.identity.aio import DefaultAzureCredential
+# Created before anything else is imported, so that the startup profile covers all imports
+STARTUP_PROFILE = StartupProfile()
 
-from semantic_kernel.agents import GroupChatOrchestration, AzureAIAgent, AzureAIAgentSettings
-from semantic_kernel.agents.runtime import InProcessRuntime
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
-from semantic_kernel.connectors.mcp import MCPStdioPlugin
-from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
+# Semantic Kernel, the Azure SDKs and the modules built on them are imported when they are first used,
+# so that the prompt is shown right away and the imports overlap with typing the task
+if TYPE_CHECKING:
+    from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 
-from plugins.file_plugin import FilePlugin
-from plugins.call_plugin import CallPlugin
-from app_factory_chat_manager import AppFactoryChatManager
+    from agent_registry import AgentRegistry
+    from app_factory_orchestration import AppFactoryGroupChatOrchestration
+    from artifact_store import ArtifactStore
+    from browser_pool import BrowserPool
+    from call_server import CallServer
+    from run_metrics import RunRecorder
+    from session_log import SessionLog, SessionState
+    from stream_renderer import StreamRenderer
 
 
 class AgentManager:
-    def __init__(self):
+    # Names of the plugins attached to each agent, which are part of the agent registry fingerprint
+    agent_tools = {
+        "Developer": [],
+        "FileManager": ["FilePlugin"],
+        "QualityAssurance": ["BrowserPlugin", "QaTestCachePlugin"],
+        "CallOperator": ["CallPlugin"],
+    }
+
+    def __init__(self, registry: AgentRegistry = None, browser_pool: BrowserPool = None,
+                 call_server: CallServer = None, definitions: list = None, model_tiers: ModelTiers = None):
         self.agents = []
         self.browser_plugin = None
+        # Warm browsers are taken from the pool if set, else a browser is started for this session
+        self.browser_pool = browser_pool
+        # The call server is shared by the call plugins of all sessions if set, else each plugin starts its own
+        self.call_server = call_server
+        # Agent definitions provisioned by another agent manager are shared and not deleted on cleanup
+        self.definitions = definitions
+        self.owns_definitions = definitions is None
         self.agent_colors = {}
-    
-    async def create_agents(self, client, session_dir: str):
-        # Developer agent
-        dev_agent_definition = await client.agents.create_agent(
-            model=AzureAIAgentSettings().model_deployment_name,
-            name="Developer",
-            instructions=(
-                    "You are a web developer with experience building web applications using HTML, CSS and JavaScript. Your goal is to build a web app that meets the requirements."
-                    "You write well-documented, well-structured code and are detail-oriented. You do not write code for testing or quality assurance or interfer with those tasks."
-                    "Always provide an index.html, a styles.css, and a script.js. You can request for these files to be saved to disk."
-                    "Only use standard ASCII characters in your code. Never use emoji! Make sure all elements have labels and are accessible!"
-                    "Perform your task and provide feedback on the results. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
-            ),
-            description="A web developer.",
-            temperature=0.3,
-        )
-        dev_agent = AzureAIAgent(
-            client=client,
-            definition=dev_agent_definition,
-            plugins=[]
-        )
-        self.agent_colors["Developer"] = "\033[38;2;92;207;230m"  # Cyan
+        self.registry = registry
+        # The model deployment of each agent, from the environment if not set
+        self.model_tiers = model_tiers
+
+    def _agent_definitions(self) -> list[dict]:
+        """Return the create_agent arguments for all agents of the factory.
 
-        # File agent
-        file_agent_definition = await client.agents.create_agent(
-            model=AzureAIAgentSettings().model_deployment_name,
-            name="FileManager",
-            instructions=(
-                    "You are a file manager with experience handling file systems. Your goal is to manage files effectively."
-                    f"Create files on the local file system when instructed. Your working directory is {session_dir}."
-                    "When changes to the application are made, ensure that the files are updated accordingly."
-                    "You do not code or come up with your own file content. Never write files that are not requested!"
-                    "Perform your task and provide feedback on the results. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
+        The instructions do not depend on the session, so that the definitions can be reused across runs.
+        The session directory is passed to the agents as the session_dir argument at runtime instead.
+        """
+        if self.model_tiers is None:
+            self.model_tiers = ModelTiers.from_env()
+        model = self.model_tiers.deployment
+        return [
+            # Developer agent
+            dict(
+                model=model("Developer"),
+                name="Developer",
+                instructions=(
+                        "You are a web developer with experience building web applications using HTML, CSS and JavaScript. Your goal is to build a web app that meets the requirements."
+                        "You write well-documented, well-structured code and are detail-oriented. You do not write code for testing or quality assurance or interfer with those tasks."
+                        "Always provide an index.html, a styles.css, and a script.js. You can request for these files to be saved to disk."
+                        "Provide the complete files for the first version. For later changes, only provide the changes as a unified diff with --- / +++ file headers in a ```diff code block against the latest saved version, unless most of a file changes."
+                        "Only use standard ASCII characters in your code. Never use emoji! Make sure all elements have labels and are accessible!"
+                        "Perform your task and provide feedback on the results. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
+                ),
+                description="A web developer.",
+                temperature=0.3,
             ),
-            description="A file manager.",
-            temperature=0.1,
-        )
-        file_agent = AzureAIAgent(
-            client=client,
-            definition=file_agent_definition,
-            plugins=[FilePlugin(base_dir=session_dir)]
+            # File agent
+            dict(
+                model=model("FileManager"),
+                name="FileManager",
+                instructions=(
+                        "You are a file manager with experience handling file systems. Your goal is to manage files effectively."
+                        "Create files on the local file system when instructed. Your working directory is {{$session_dir}}."
+                        "Save all files of a change with a single create_files call. Apply changes provided as a unified diff with apply_patch instead of rewriting the files."
+                        "When changes to the application are made, ensure that the files are updated accordingly."
+                        "You do not code or come up with your own file content. Never write files that are not requested!"
+                        "Code may be shared as artifact handles like [artifact index.html | 2048 bytes | sha256:0123456789ab]. Pass such a handle unchanged as the file content, it is resolved automatically."
+                        "Handles ending in .diff or .patch, like [artifact script.js.diff | 512 bytes | sha256:0123456789ab], are patches: pass them unchanged to apply_patch and never as file content to create_files or create_file."
+                        "Perform your task and provide feedback on the results. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
+                ),
+                description="A file manager.",
+                temperature=0.1,
+            ),
+            # Quality Assurance agent
+            dict(
+                model=model("QualityAssurance"),
+                name="QualityAssurance",
+                instructions=(
+                    "You are an excellent quality assurance specialist. You create and execute test cases to ensure the quality of web applications."
+                    "You do not write code for development or testing, but you can use browser automation to test the application."
+                    "You can find the application locally at {{$session_dir}}/index.html."
+                    "Before testing, get the test plan with get_test_plan. If no test cases are recorded yet, design three simple test cases for the application and execute them. Before you start a test, announce what you are going to test."
+                    "Otherwise only run the tests that the test plan tells you to run again, and report the other tests as passed (cached)."
+                    "If changes have been made to the application, also test specifically for those changes. Make sure to reload the application before testing!"
+                    "After each test, record its result with record_test_result, listing the session files the test exercised, e.g. index.html and script.js for logic and index.html and styles.css for layout."
+                    "You do not interfere with the human expert review."
+                    "Perform your task and provide feedback on the results of your tests. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
+                ),
+                description="A quality assurance specialist.",
+                temperature=0.1,
+            ),
+            # Calling agent
+            dict(
+                model=model("CallOperator"),
+                name="CallOperator",
+                instructions=(
+                        "You are a call operator. You can initiate calls to a human expert and handle their response. Do not interfere with the development or testing processes."
+                        "The human expert is aware of the task and is expecting your call. You do not need to explain anything to them."
+                        "If your call is unsuccessful, try calling again."
+                        "You cannot code or modify the application yourself. Never write any code! Only instruct others to do so."
+                        "Perform your task and provide feedback on the result. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
+                ),
+                description="A call operator that can call experts for reviews.",
+                temperature=0.1,
+            ),
+        ]
+
+    def fingerprints(self) -> set[str]:
+        """Return the registry fingerprints of the current agent definitions."""
+        return {
+            self.registry.fingerprint(definition, self.agent_tools[definition["name"]])
+            for definition in self._agent_definitions()
+        }
+
+    async def _get_or_create_definition(self, client, definition: dict):
+        if self.registry:
+            return await self.registry.get_or_create(client, definition, self.agent_tools[definition["name"]])
+        return await client.agents.create_agent(**definition)
+
+    async def provision(self, client) -> list:
+        """Create or reuse all agent definitions, so that the agents of several sessions can share them."""
+        start_time = time.perf_counter()
+        timings = {}
+        definition_results = await asyncio.gather(
+            *(self._timed(timings, definition["name"], self._get_or_create_definition(client, definition))
+              for definition in self._agent_definitions()),
+            return_exceptions=True,
         )
+        created = [result for result in definition_results if not isinstance(result, BaseException)]
+        errors = [result for result in definition_results if isinstance(result, BaseException)]
+        if self.registry:
+            self.registry.save()
+        if errors:
+            if not self.registry:
+                print(f"**Agent Manager**: Provisioning failed, rolling back {len(created)} created agents...")
+                await self._delete_agents(client, [definition.id for definition in created])
+            raise errors[0]
+
+        self.definitions = created
+        self._print_timings("Provisioned agent definitions", time.perf_counter() - start_time, timings)
+        return created
+
+    @staticmethod
+    async def _timed(timings: dict[str, float], label: str, awaitable):
+        task_start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[label] = time.perf_counter() - task_start
+
+    async def create_agents(self, client, session_dir: str, artifact_store: ArtifactStore = None):
+        """Create or reuse all agent definitions and connect the browser plugin concurrently.
+
+        If the agent definitions were provisioned already, only the agents of the session are created.
+        """
+        from semantic_kernel.agents import AzureAIAgent
+        from semantic_kernel.connectors.mcp import MCPStdioPlugin
+        from semantic_kernel.functions import KernelArguments
+
+        from browser_pool import browser_command
+        from plugins.call_plugin import CallPlugin
+        from plugins.file_plugin import FilePlugin
+        from plugins.qa_cache_plugin import QaTestCachePlugin
+
+        start_time = time.perf_counter()
+        timings = {}
+
+        def timed(label, awaitable):
+            return self._timed(timings, label, awaitable)
+
+        # The agent definitions are created as background tasks, while the browser plugin is connected
+        # in the current task, as the MCP connection has to be closed by the same task that opened it.
+        definition_tasks = None
+        if self.definitions is None:
+            definition_tasks = [
+                asyncio.ensure_future(timed(definition["name"], self._get_or_create_definition(client, definition)))
+                for definition in self._agent_definitions()
+            ]
+
+        # A cancellation of the session, e.g. by the task timeout of a batch, rolls back like an error
+        interruption = None
+        browser_error = None
+        try:
+            if self.browser_pool:
+                self.browser_plugin = await timed("BrowserPlugin", self.browser_pool.acquire())
+            else:
+                command, args = browser_command()
+                self.browser_plugin = MCPStdioPlugin(
+                        name="BrowserPlugin",
+                        description="A plugin for browser automation.",
+                        command=command,
+                        args=args,
+                )
+                await timed("BrowserPlugin", self.browser_plugin.connect())
+        except Exception as e:
+            browser_error = e
+        except BaseException as e:
+            interruption = e
+
+        if definition_tasks is None:
+            created, errors = self.definitions, []
+        else:
+            if interruption is None:
+                try:
+                    await asyncio.wait(definition_tasks)
+                except BaseException as e:
+                    interruption = e
+            if interruption:
+                # Definitions that were created before the cancellation are kept for the rollback
+                for task in definition_tasks:
+                    task.cancel()
+                await asyncio.wait(definition_tasks)
+            finished = [task for task in definition_tasks if not task.cancelled()]
+            created = [task.result() for task in finished if task.exception() is None]
+            errors = [task.exception() for task in finished if task.exception() is not None]
+            if self.registry:
+                self.registry.save()
+        if browser_error:
+            errors.append(browser_error)
+        if interruption:
+            errors.insert(0, interruption)
+
+        if errors:
+            # Roll back everything that was provisioned successfully so that no agents are leaked.
+            # Registered agents are tracked by the registry and are kept for the next run.
+            await self._close_browser_plugin()
+            if not self.registry and definition_tasks is not None:
+                print(f"**Agent Manager**: Provisioning failed, rolling back {len(created)} created agents...")
+                await self._delete_agents(client, [definition.id for definition in created])
+            raise errors[0]
+
+        plugins = {
+            "Developer": [],
+            "FileManager": [FilePlugin(base_dir=session_dir, artifact_store=artifact_store)],
+            "QualityAssurance": [self.browser_plugin, QaTestCachePlugin(base_dir=session_dir)],
+            "CallOperator": [CallPlugin(call_server=self.call_server)],
+        }
+        self.agents = [
+            AzureAIAgent(
+                client=client,
+                definition=definition,
+                plugins=plugins[definition.name],
+                arguments=KernelArguments(session_dir=session_dir),
+            )
+            for definition in created
+        ]
+        self.definitions = created
+
+        self.agent_colors["Developer"] = "\033[38;2;92;207;230m"  # Cyan
         self.agent_colors["FileManager"] = "\033[38;2;255;209;115m"  # Yellow
+        self.agent_colors["QualityAssurance"] = "\033[38;2;213;255;128m"  # Green
+        self.agent_colors["CallOperator"] = "\033[38;2;242;135;121m"  # Orange/Red
 
-        # Quality Assurance agent
-        self.browser_plugin = MCPStdioPlugin(
-                name="BrowserPlugin",
-                description="A plugin for browser automation.",
-                command="npx",
-                args=["@playwright/mcp@latest", "--browser", "msedge", "--caps", "vision"]
-        )
-        await self.browser_plugin.connect()
-
-        qa_agent_definition = await client.agents.create_agent(
-            model=AzureAIAgentSettings().model_deployment_name,
-            name="QualityAssurance",
-            instructions=(
-                "You are an excellent quality assurance specialist. You create and execute test cases to ensure the quality of web applications."
-                "You do not write code for development or testing, but you can use browser automation to test the application."
-                f"You can find the application locally at {session_dir}/index.html."
-                "If you have not yet done so, design three simple test cases for the application and execute them. Before you start a test, announce what you are going to test."
-                "If changes have been made to the application, test specifically for those changes. Make sure to reload the application before testing!"
-                "You do not interfere with the human expert review."
-                "Perform your task and provide feedback on the results of your tests. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
-            ),
-            description="A quality assurance specialist.",
-            temperature=0.1,
-        )
-        qa_agent = AzureAIAgent(
-            client=client,
-            definition=qa_agent_definition,
-            plugins=[self.browser_plugin]
+        self._print_timings("Provisioned agents and browser plugin", time.perf_counter() - start_time, timings)
+        return self.agents
+
+    async def cleanup(self, client, reuse_browser: bool = True):
+        """Close the browser plugin and delete all agents concurrently.
+
+        Agents tracked by the registry are kept for the next run and can be pruned with gc. A pooled browser
+        that may still be in use by a cancelled session is replaced instead of returned to the pool.
+        """
+        start_time = time.perf_counter()
+        timings = {}
+
+        async def timed_delete(definition):
+            task_start = time.perf_counter()
+            try:
+                await client.agents.delete_agent(agent_id=definition.id)
+            finally:
+                timings[definition.name] = time.perf_counter() - task_start
+
+        definitions_to_delete = [] if self.registry or not self.owns_definitions else (self.definitions or [])
+        delete_results = asyncio.gather(
+            *(timed_delete(definition) for definition in definitions_to_delete),
+            return_exceptions=True,
         )
-        self.agent_colors["QualityAssurance"] = "\033[38;2;213;255;128m"  # Green
+        browser_start = time.perf_counter()
+        await self._close_browser_plugin(reuse=reuse_browser)
+        timings["BrowserPlugin"] = time.perf_counter() - browser_start
 
-        # Calling agent
-        calling_agent_definition = await client.agents.create_agent(
-            model=AzureAIAgentSettings().model_deployment_name,
-            name="CallOperator",
-            instructions=(
-                    "You are a call operator. You can initiate calls to a human expert and handle their response. Do not interfere with the development or testing processes."
-                    "The human expert is aware of the task and is expecting your call. You do not need to explain anything to them."
-                    "If your call is unsuccessful, try calling again."
-                    "You cannot code or modify the application yourself. Never write any code! Only instruct others to do so."
-                    "Perform your task and provide feedback on the result. Do not ask for clarification or assistance. Do not recommend next steps or further actions."
-            ),
-            description="A call operator that can call experts for reviews.",
-            temperature=0.1,
+        for definition, result in zip(definitions_to_delete, await delete_results):
+            if isinstance(result, BaseException):
+                print(f"**Agent Manager**: Failed to delete agent {definition.name} ({definition.id}): {result}")
+        self.agents = []
+        if self.owns_definitions:
+            self.definitions = None
+
+        self._print_timings("Cleaned up agents and browser plugin", time.perf_counter() - start_time, timings)
+
+    async def gc(self, client) -> list[str]:
+        """Delete all registered agents that do not match the current agent definitions."""
+        if not self.registry:
+            return []
+        return await self.registry.gc(client, keep=self.fingerprints())
+
+    async def _close_browser_plugin(self, reuse: bool = True):
+        if self.browser_plugin:
+            try:
+                if self.browser_pool:
+                    await self.browser_pool.release(self.browser_plugin, reuse=reuse)
+                else:
+                    await self.browser_plugin.close()
+            except Exception as e:
+                print(f"**Agent Manager**: Failed to close browser plugin: {e}")
+            self.browser_plugin = None
+
+    async def _delete_agents(self, client, agent_ids: list[str]):
+        results = await asyncio.gather(
+            *(client.agents.delete_agent(agent_id=agent_id) for agent_id in agent_ids),
+            return_exceptions=True,
         )
-        calling_agent = AzureAIAgent(
-            client=client,
-            definition=calling_agent_definition,
-            plugins=[CallPlugin()]
+        for agent_id, result in zip(agent_ids, results):
+            if isinstance(result, BaseException):
+                print(f"**Agent Manager**: Failed to delete agent {agent_id}: {result}")
+
+    def _print_timings(self, action: str, elapsed: float, timings: dict[str, float]):
+        """Print the wall time of a concurrent operation compared to running its steps one after another."""
+        sequential = sum(timings.values())
+        speedup = sequential / elapsed if elapsed > 0 else 1.0
+        print("**Agent Manager**:")
+        print(f"-- {action} in {elapsed:.2f}s (sequential: {sequential:.2f}s, speedup: {speedup:.1f}x)")
+        for label, duration in timings.items():
+            print(f"-- {label}: {duration:.2f}s")
+
+
+async def gc_agents(model_tiers: ModelTiers = None) -> None:
+    """Delete all registered agents that no longer match the current agent definitions."""
+    from azure.identity.aio import DefaultAzureCredential
+    from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
+
+    from agent_registry import AgentRegistry
+
+    async with (
+        DefaultAzureCredential() as creds,
+        AzureAIAgent.create_client(credential=creds) as client,
+    ):
+        agent_manager = AgentManager(registry=AgentRegistry(scope=AzureAIAgentSettings().endpoint), model_tiers=model_tiers)
+        pruned = await agent_manager.gc(client)
+        print(f"Pruned {len(pruned)} stale agents" + (f": {', '.join(pruned)}" if pruned else "."))
+
+
+def create_chat_service(deployment_name: str = None) -> AzureChatCompletion:
+    """Create a chat completion service of the chat manager, with the agent model deployment if none is given."""
+    from semantic_kernel.agents import AzureAIAgentSettings
+    from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+
+    endpoint = AzureAIAgentSettings().endpoint.split('/api')[0].rstrip('/') + '/' # Remove project ID from Azure AI Agent endpoint to utilize it for Azure OpenAI authentication
+    model_name = deployment_name or AzureAIAgentSettings().model_deployment_name
+    return AzureChatCompletion(
+        endpoint=endpoint,
+        deployment_name=model_name
+    )
+
+
+def create_routing_service(model_tiers: ModelTiers) -> AzureChatCompletion | None:
+    """Create the chat completion service for the routing decisions of the chat manager, if they use the small tier."""
+    deployment = model_tiers.deployment("ChatManager")
+    return create_chat_service(deployment) if deployment != model_tiers.large else None
+
+
+def create_orchestration(
+    args: argparse.Namespace,
+    agents: list,
+    agent_colors: dict[str, str],
+    session_dir: str,
+    artifact_store: ArtifactStore | None,
+    service: AzureChatCompletion,
+    run_recorder: RunRecorder,
+    session_log: SessionLog | None = None,
+    start_round: int = 0,
+    routing_service: AzureChatCompletion | None = None,
+) -> tuple[AppFactoryGroupChatOrchestration, StreamRenderer]:
+    """Create the group chat orchestration of a session and the renderer of its streamed responses.
+
+    A resumed session continues with the round after start_round. If a routing service is given, the chat manager
+    uses it for its termination and selection decisions.
+    """
+    from app_factory_chat_manager import AppFactoryChatManager
+    from app_factory_orchestration import AppFactoryGroupChatOrchestration
+    from code_writer import CodeWriter
+    from context_filter import create_context_filters
+    from manager_context import ManagerContextBuilder
+    from plugins.file_plugin import FilePlugin
+    from speaker_selector import RuleBasedSpeakerSelector
+    from static_check import StaticChecker
+    from stream_renderer import StreamRenderer
+    from workflow_graph import WorkflowGraph
+
+    manager = AppFactoryChatManager(
+        service=service,
+        routing_service=routing_service,
+        max_rounds=15,
+        current_round=start_round,
+        fused_decisions=args.fused_manager,
+        speaker_selector=None if args.no_fast_path else RuleBasedSpeakerSelector(),
+        context_builder=(
+            ManagerContextBuilder(token_budget=args.manager_context_tokens)
+            if args.manager_context_tokens > 0 else None
+        ),
+        run_recorder=run_recorder,
+        session_log=session_log,
+    )
+    # Code is saved directly before it is replaced by artifact handles
+    response_processors = []
+    if args.direct_file_writes:
+        response_processors.append(
+            CodeWriter(FilePlugin(base_dir=session_dir, artifact_store=artifact_store)).process
         )
-        self.agent_colors["CallOperator"] = "\033[38;2;242;135;121m"  # Orange/Red
+    # Saved files are checked statically before the browser test
+    if not args.no_static_check:
+        response_processors.append(StaticChecker(session_dir).process)
+    if artifact_store:
+        response_processors.append(artifact_store.process)
 
-        self.agents = [dev_agent, file_agent, qa_agent, calling_agent]
-        return self.agents
-    
-    async def cleanup(self, client):
-        if self.browser_plugin:
-            await self.browser_plugin.close()
-        
-        for agent in self.agents:
-            await client.agents.delete_agent(agent_id=agent.id)
-
-
-def streaming_agent_response_callback(message: StreamingChatMessageContent, is_last: bool, agent_manager) -> None:
-    """Callback to display streaming agent responses in real-time."""
-    reset_color = "\033[0m"
-    
-    # Get color for the current agent
-    color = agent_manager.agent_colors.get(message.name, "\033[37m") if message.name else "\033[37m"
-    
-    # Handle agent name changes
-    if hasattr(message, 'name') and message.name and not hasattr(streaming_agent_response_callback, 'current_agent'):
-        print(f"\n{color}**{message.name}**: ", end="", flush=True)
-        streaming_agent_response_callback.current_agent = message.name
-    elif hasattr(message, 'name') and message.name != getattr(streaming_agent_response_callback, 'current_agent', None):
-        print(f"\n{color}**{message.name}**: ", end="", flush=True)
-        streaming_agent_response_callback.current_agent = message.name
-        
-    # Print the streaming content in the agent's color
-    if message.content:
-        print(f"{color}{message.content}{reset_color}", end="", flush=True)
-
-    # Print function calls if any
-    for item in message.items:
-        if item.content_type == 'function_call':
-            print(f"\n{color}-- Calling function {item.name} with arguments {item.arguments}{reset_color}", end="", flush=True)
-        elif item.content_type == 'function_result':
-            result_str = str(item.result)
-            if len(result_str) > 100:
-                result_str = result_str[:100] + "..."
-            print(f"\n{color}Function {item.name} returned {result_str}{reset_color}", end="", flush=True)
-
-    # If this is the last chunk, add a separator
-    if is_last:
-        print(f"\n{reset_color}" + "─" * 50)
-        if hasattr(streaming_agent_response_callback, 'current_agent'):
-            delattr(streaming_agent_response_callback, 'current_agent')
-
-
-async def main() -> None:
-    # Create a session timestamp in a format that works well with file paths
-    session_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    session_dir = os.path.abspath(os.path.join("sessions", session_timestamp))
-    os.makedirs(session_dir, exist_ok=True)
+    renderer = StreamRenderer(agent_colors=agent_colors, quiet=args.quiet)
+    orchestration = AppFactoryGroupChatOrchestration(
+        members=agents,
+        manager=manager,
+        response_processors=response_processors,
+        run_recorder=run_recorder,
+        workflow_graph=WorkflowGraph() if args.parallel_steps else None,
+        context_filters=None if args.no_context_filters else create_context_filters(),
+        agent_response_callback=manager.observe,
+        streaming_agent_response_callback=renderer.render,
+    )
+    return orchestration, renderer
+
+
+def task_prompt(task: str, agents: list) -> str:
+    """Frame the app request of the user with the workflow of the team."""
+    return (
+            "You are working in a multidisciplinary team to develop a web application. Accomplish the following task while remaining in your own role."
+            "IMPORTANT: Only work on steps that match your own role. Not all steps are for you."
+            f"The team consists of the following agents: {', '.join(agent.name for agent in agents)}."
+            f"Task: {task}"
+            "As a team, you should follow these steps:"
+            "1. Provide complete code for the web application."
+            "2. Ensure that the code files have been created in the session directory."
+            "3. Develop a set of tests and execute them."
+            "4. Run the tests and verify that they have passed successfully."
+            "5. Ensure that a human expert has been called to review the app and that the expert explicitly approved the application."
+            "6. If the human expert suggested changes, ensure that the developer has implemented them and that the new code has been saved."
+            "7. If changes were made, ensure that quality control has been performed again."
+    )
+
+
+def remove_session_dir(session_dir: str):
+    """Remove the session directory and its contents."""
+    for root, dirs, files in os.walk(session_dir, topdown=False):
+        for name in files:
+            os.remove(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(session_dir)
+
+
+def finish_session_dir(session_dir: str, completed: bool, archive: bool):
+    """Archive or delete the directory of a completed session, and keep the directory of an unfinished one."""
+    from session_log import archive_session_dir
+
+    if not completed:
+        print(f"Session directory '{session_dir}' kept. Resume with: python app_factory.py --resume {os.path.basename(session_dir)}")
+    elif archive:
+        print(f"Session directory '{session_dir}' archived to '{archive_session_dir(session_dir)}'.")
+    else:
+        remove_session_dir(session_dir)
+        print(f"Session directory '{session_dir}' deleted successfully.")
+
+
+def load_session(session: str) -> tuple[str, SessionState]:
+    """Get the directory and the logged state of a session to resume, given by its name or path."""
+    from session_log import SessionLog
+
+    session_dir = session if os.path.isdir(session) else os.path.join("sessions", session)
+    session_dir = os.path.abspath(session_dir)
+    state = SessionLog.load(session_dir)
+    if state.finished:
+        raise ValueError(f"The session in {session_dir} has already finished.")
+    return session_dir, state
+
+
+class DeferredOutput(io.TextIOBase):
+    """Holds back output while the user types, so that it does not garble the input line.
+
+    The held back output is written before the first output after the input is done, or on release.
+    """
+
+    def __init__(self, stream, pending: Callable[[], bool]):
+        self.stream = stream
+        self.pending = pending
+        self._held: list[str] = []
+
+    def write(self, text: str) -> int:
+        if self.pending():
+            self._held.append(text)
+        else:
+            self.release()
+            self.stream.write(text)
+        return len(text)
+
+    def release(self):
+        if self._held:
+            self.stream.write("".join(self._held))
+            self._held.clear()
+
+    def flush(self):
+        if not self.pending():
+            self.release()
+        self.stream.flush()
+
+    def fileno(self) -> int:
+        # Lets input() use the terminal of the underlying stream, with line editing
+        return self.stream.fileno()
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+
+def prompt_in_background(prompt: str) -> asyncio.Future:
+    """Ask for input in a daemon thread, so that the startup continues while the user types.
+
+    A daemon thread is used instead of asyncio.to_thread, so that a failed startup does not wait for the input.
+    The prompt is written before the thread starts, as the output of the startup may be held back meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    print(prompt, end="", flush=True)
+
+    def read_input():
+        try:
+            result = input()
+        except BaseException as e:
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(e))
+            return
+        loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+    threading.Thread(target=read_input, daemon=True).start()
+    return future
+
+
+async def main(args: argparse.Namespace) -> None:
+    profile = STARTUP_PROFILE
+    profile.mark("main started")
+
+    if args.resume:
+        await run_session(args)
+        return
+
+    # Get task from user, and hold back the output of the startup while the user types
+    task_input = prompt_in_background("What app would you like the agents to build? ")
+    profile.mark("first prompt shown")
+    stdout = sys.stdout
+    deferred_output = DeferredOutput(stdout, pending=lambda: not task_input.done())
+    sys.stdout = deferred_output
+    try:
+        await run_session(args, task_input)
+    finally:
+        sys.stdout = stdout
+        deferred_output.release()
+
+
+async def run_session(args: argparse.Namespace, task_input: asyncio.Future | None = None) -> None:
+    """Run a new session with the task of the pending input, or resume the session given by args.resume."""
+    profile = STARTUP_PROFILE
+    with profile.phase("Import Semantic Kernel and Azure SDKs"):
+        from azure.identity.aio import DefaultAzureCredential
+        from opentelemetry import trace
+        from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
+        from semantic_kernel.agents.runtime import InProcessRuntime
+    with profile.phase("Import App Factory modules"):
+        from agent_registry import AgentRegistry
+        from artifact_store import ArtifactStore
+        from run_metrics import RunRecorder
+        from session_log import SessionLog
+
+    resume_state = None
+    if args.resume:
+        session_dir, resume_state = load_session(args.resume)
+    else:
+        # Create a session timestamp in a format that works well with file paths
+        session_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        session_dir = os.path.abspath(os.path.join("sessions", session_timestamp))
+        os.makedirs(session_dir, exist_ok=True)
+    session_log = SessionLog(session_dir)
+    completed = False
 
     async with (
         DefaultAzureCredential() as creds,
         AzureAIAgent.create_client(credential=creds) as client,
     ):
         # Create agent manager and get agents
-        agent_manager = AgentManager()
-        agents = await agent_manager.create_agents(client, session_dir)
+        registry = None if args.no_agent_cache else AgentRegistry(scope=AzureAIAgentSettings().endpoint)
+        # A single session cannot reuse a pooled browser, the browser is connected while the agents are provisioned
+        model_tiers = ModelTiers.from_env(args.small_model_roles)
+        agent_manager = AgentManager(registry=registry, model_tiers=model_tiers)
+        artifact_store = None if args.no_artifact_handles else ArtifactStore(session_dir)
+        with profile.phase("Provision agents and browser"):
+            agents = await agent_manager.create_agents(client, session_dir, artifact_store=artifact_store)
+        run_recorder = RunRecorder(
+            path=args.metrics_file,
+            tracer=trace.get_tracer("app_factory") if args.trace else None,
+        )
 
         try:
-            endpoint = AzureAIAgentSettings().endpoint.split('/api')[0].rstrip('/') + '/' # Remove project ID from Azure AI Agent endpoint to utilize it for Azure OpenAI authentication
-            model_name = AzureAIAgentSettings().model_deployment_name
-            service = AzureChatCompletion(
-                endpoint=endpoint,
-                deployment_name=model_name
-            )
-
-            group_chat_orchestration = GroupChatOrchestration(
-                members=agents,
-                manager=AppFactoryChatManager(
-                    service=service,
-                    max_rounds=15,
-                ),
-                streaming_agent_response_callback=lambda msg, is_last: streaming_agent_response_callback(msg, is_last, agent_manager),
+            group_chat_orchestration, renderer = create_orchestration(
+                args, agents, agent_manager.agent_colors, session_dir, artifact_store, create_chat_service(), run_recorder,
+                session_log=session_log,
+                # The last logged round is repeated, as its agent may not have responded
+                start_round=max(resume_state.round - 1, 0) if resume_state else 0,
+                routing_service=create_routing_service(model_tiers),
             )
 
             # 2. Create a runtime and start it
             runtime = InProcessRuntime()
             runtime.start()
 
-            # Get task from user
-            task = input("What app would you like the agents to build? ")
+            if resume_state:
+                # Continue with the logged chat history instead of the task
+                changed = session_log.resume(resume_state)
+                print(f"**Session Log**: Resuming {os.path.basename(session_dir)} after round {resume_state.round - 1} with {len(resume_state.messages)} messages")
+                if changed:
+                    print(f"-- Files changed after the last logged round: {', '.join(changed)}")
+                task = resume_state.messages or task_prompt(resume_state.task, agents)
+            else:
+                if not task_input.done():
+                    profile.mark("ready, waiting for the task")
+                task = await task_input
+                profile.mark("task entered")
+                session_log.log_start(task)
+                task = task_prompt(task, agents)
 
             # 3. Invoke the orchestration with a task and the runtime
             orchestration_result = await group_chat_orchestration.invoke(
-                task=(
-                        "You are working in a multidisciplinary team to develop a web application. Accomplish the following task while remaining in your own role."
-                        "IMPORTANT: Only work on steps that match your own role. Not all steps are for you."
-                        f"The team consists of the following agents: {', '.join(agent.name for agent in agents)}."
-                        f"Task: {task}"
-                        "As a team, you should follow these steps:"
-                        "1. Provide complete code for the web application."
-                        "2. Ensure that the code files have been created in the session directory."
-                        "3. Develop a set of tests and execute them."
-                        "4. Run the tests and verify that they have passed successfully."
-                        "5. Ensure that a human expert has been called to review the app and that the expert explicitly approved the application."
-                        "6. If the human expert suggested changes, ensure that the developer has implemented them and that the new code has been saved."
-                        "7. If changes were made, ensure that quality control has been performed again."
-                ),
+                task=task,
                 runtime=runtime,
             )
+            profile.mark("orchestration started")
 
             # 4. Wait for the results
             value = await orchestration_result.get()
+            await renderer.close()
+            session_log.log_end(value.metadata.get("termination_reason", ""))
+            completed = True
             print(value)
 
             # 5. Stop the runtime after the invocation is complete
             await runtime.stop_when_idle()
         finally:
-            input(f"Run complete. Press any key to initiate cleanup.")
+            if args.profile_startup:
+                profile.print_report()
+            run_recorder.print_summary()
+            if model_tiers.enabled:
+                model_tiers.print_comparison(run_recorder.records)
+            run_recorder.close()
+            # The prompt for the task may still be waiting for input if the run failed before it was needed
+            if task_input is None or task_input.done():
+                input(f"Run complete. Press any key to initiate cleanup.")
             await agent_manager.cleanup(client)
-            print("All agents deleted successfully.")
-            # Remove the session directory and its contents
-            for root, dirs, files in os.walk(session_dir, topdown=False):
-                for name in files:
-                    os.remove(os.path.join(root, name))
-                for name in dirs:
-                    os.rmdir(os.path.join(root, name))
-            os.rmdir(session_dir)
-            print(f"Session directory '{session_dir}' deleted successfully.")
+            if registry:
+                print("Agents kept for the next run. Use --gc to prune stale agents.")
+            else:
+                print("All agents deleted successfully.")
+            finish_session_dir(session_dir, completed, archive=args.archive_sessions)
+
+
+def build_parser(description: str = "Build web apps with a team of AI agents.") -> argparse.ArgumentParser:
+    """Build the parser of the options that a single run and a batch share."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--no-agent-cache",
+        action="store_true",
+        help="Create fresh agent definitions for this run and delete them afterwards.",
+    )
+    parser.add_argument(
+        "--fused-manager",
+        action="store_true",
+        help="Let the chat manager decide on termination and the next speaker in a single call per round.",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Always ask the model for the next speaker instead of using the rule-based fast path first.",
+    )
+    parser.add_argument(
+        "--manager-context-tokens",
+        type=int,
+        default=8000,
+        help="Approximate token budget of the chat history sent with each chat manager call (0 sends the full history).",
+    )
+    parser.add_argument(
+        "--no-artifact-handles",
+        action="store_true",
+        help="Share code in the group chat as full text instead of replacing it with artifact handles.",
+    )
+    parser.add_argument(
+        "--direct-file-writes",
+        action="store_true",
+        help="Save code blocks with clear file names from Developer messages directly instead of through the FileManager.",
+    )
+    parser.add_argument(
+        "--no-static-check",
+        action="store_true",
+        help="Do not check saved files statically (HTML, asset references, labels, JavaScript syntax, non-ASCII) before the browser test.",
+    )
+    parser.add_argument(
+        "--no-context-filters",
+        action="store_true",
+        help="Share every message of the group chat in full with every agent instead of shortening the messages a role does not need.",
+    )
+    parser.add_argument(
+        "--parallel-steps",
+        action="store_true",
+        help="Run independent workflow steps, such as the browser test and the expert call on the saved files, at the same time.",
+    )
+    parser.add_argument(
+        "--small-model-roles",
+        type=lambda value: [role.strip() for role in value.split(",") if role.strip()],
+        default=DEFAULT_SMALL_MODEL_ROLES,
+        help="Comma-separated roles (agent names, or ChatManager for its termination and selection decisions) that use "
+             "the AZURE_AI_AGENT_SMALL_MODEL_DEPLOYMENT_NAME deployment. An empty value runs all roles on the large model.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not render the streamed agent responses, e.g. for headless runs.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Append the latency and token records of each round to this JSONL file.",
+    )
+    parser.add_argument(
+        "--archive-sessions",
+        action="store_true",
+        help="Archive the directories of finished sessions to sessions/archive instead of deleting them.",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print how long the imports, the provisioning and the other startup phases took and when the first prompt was shown.",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Export the latency records as OpenTelemetry spans to the configured tracer provider.",
+    )
+    return parser
+
+
+def parse_args() -> argparse.Namespace:
+    parser = build_parser()
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="Delete registered agents that do not match the current agent definitions and exit.",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="SESSION",
+        help="Resume an unfinished session (name or path of its directory) from its last completed round.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(gc_agents(ModelTiers.from_env(args.small_model_roles)) if args.gc else main(args))
     except KeyboardInterrupt:
         print("\nRun cancelled by user.")
\ No newline at end of file
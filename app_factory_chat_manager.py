@@ -1,16 +1,50 @@
-from typing import override
+from collections.abc import Callable
+import time
+from typing import TypeVar, override
+from pydantic import PrivateAttr, ValidationError
 from semantic_kernel.agents.orchestration.group_chat import BooleanResult, GroupChatManager, MessageResult, StringResult
 from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
 from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
 from semantic_kernel.functions import KernelArguments
 from semantic_kernel.kernel import Kernel
+from semantic_kernel.kernel_pydantic import KernelBaseModel
 from semantic_kernel.prompt_template import KernelPromptTemplate, PromptTemplateConfig
 
+from manager_context import ManagerContextBuilder
+from run_metrics import RunRecorder
+from session_log import SessionLog
+from speaker_selector import SpeakerSelector
+
+
+ResultT = TypeVar("ResultT", bound=KernelBaseModel)
+
+
+class ManagerDecision(KernelBaseModel):
+    """A combined termination and speaker selection decision of the group chat manager."""
+
+    should_terminate: bool
+    termination_reason: str
+    next_agent: str
+    selection_reason: str
+
 
 class AppFactoryChatManager(GroupChatManager):
      
     service: ChatCompletionClientBase
+    # Optional service with a smaller model for the termination and selection decisions. Decisions for which it returns
+    # invalid structured output are escalated to the main service, which is also used for the summary.
+    routing_service: ChatCompletionClientBase | None = None
+    # If enabled, a single call decides both whether to terminate and who speaks next
+    fused_decisions: bool = False
+    # Optional deterministic selector that is asked before falling back to the LLM for speaker selection
+    speaker_selector: SpeakerSelector | None = None
+    # Optional builder that bounds the chat history sent with each manager call
+    context_builder: ManagerContextBuilder | None = None
+    # Optional recorder for the latency and token usage of each decision
+    run_recorder: RunRecorder | None = None
+    # Optional log of the history, files and decisions of each round, from which the session can be resumed
+    session_log: SessionLog | None = None
     termination_prompt: str = (
         "You are supervising the development of a web app."
         "In order for the task to be complete, the following needs to be true:"
@@ -29,22 +63,111 @@ class AppFactoryChatManager(GroupChatManager):
         "Here are the names and descriptions of the agents: {{$participants}}\n"
         "Respond with only the name of the agent that should perform the next task."
     )
+    # Appended to the termination prompt when deciding on termination and selection in one call
+    fused_decision_prompt: str = (
+        "If the task is not complete, you must also determine which agent should perform the next task."
+        "Here are the names and descriptions of the agents: {{$participants}}\n"
+        "Respond with whether the task is complete and the reason, and with only the name of the agent that should perform the next task and the reason."
+    )
     result_filter_prompt: str = (
         "You are supervising the development of a web app."
         "You have just concluded the task. "
         "Please summarize the process. Highlight how the app was tested."
     )
 
+    _participant_descriptions: dict[str, str] = PrivateAttr(default_factory=dict)
+    _pending_selection: StringResult | None = PrivateAttr(default=None)
+
     def __init__(self, service: ChatCompletionClientBase, **kwargs) -> None:
         """Initialize the group chat manager."""
         super().__init__(service=service, **kwargs)
 
+    def observe(self, message: ChatMessageContent) -> None:
+        """Agent response callback that lets the speaker selector observe all agent messages incl. function calls."""
+        if self.speaker_selector:
+            self.speaker_selector.observe(message)
+
     async def _render_prompt(self, prompt: str, arguments: KernelArguments) -> str:
         """Helper to render a prompt with arguments."""
         prompt_template_config = PromptTemplateConfig(template=prompt)
         prompt_template = KernelPromptTemplate(prompt_template_config=prompt_template_config)
         return await prompt_template.render(Kernel(), arguments=arguments)
 
+    async def _prepare_history(
+        self,
+        chat_history: ChatHistory,
+        prompt: str,
+        arguments: KernelArguments,
+        instruction: str,
+    ) -> ChatHistory:
+        """Helper to frame the chat history with a system prompt and an instruction for a manager call.
+
+        If a context builder is set, the chat history is reduced to a bounded view first.
+        """
+        if self.context_builder:
+            chat_history = self.context_builder.build(chat_history)
+
+        chat_history.messages.insert(
+            0,
+            ChatMessageContent(
+                role=AuthorRole.SYSTEM,
+                content=await self._render_prompt(prompt, arguments),
+            ),
+        )
+        chat_history.add_message(
+            ChatMessageContent(role=AuthorRole.USER, content=instruction),
+        )
+        return chat_history
+
+    async def _get_response(
+        self,
+        decision: str,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        service: ChatCompletionClientBase | None = None,
+        escalated: bool = False,
+    ) -> ChatMessageContent:
+        """Helper to get a response of the service for a decision and record its latency."""
+        service = service or self.service
+        started, start_counter = time.time(), time.perf_counter()
+        response = await service.get_chat_message_content(chat_history, settings=settings)
+        if self.run_recorder:
+            self.run_recorder.record_manager(
+                decision, started, time.perf_counter() - start_counter, response,
+                model=service.ai_model_id, escalated=escalated,
+            )
+        return response
+
+    async def _get_routing_result(
+        self,
+        decision: str,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        result_type: type[ResultT],
+        is_valid: Callable[[ResultT], bool] | None = None,
+    ) -> ResultT:
+        """Helper to get the structured result of a routing decision, from the routing service if set.
+
+        If the routing service returns output that does not parse as the result type or is not valid, the decision
+        is repeated with the main service.
+        """
+        if self.routing_service is None:
+            response = await self._get_response(decision, chat_history, settings)
+            return result_type.model_validate_json(response.content)
+
+        response = await self._get_response(decision, chat_history, settings, service=self.routing_service)
+        try:
+            result = result_type.model_validate_json(response.content)
+            if is_valid is None or is_valid(result):
+                return result
+            error = f"invalid result {response.content}"
+        except ValidationError as e:
+            error = e.errors()[0]["msg"]
+
+        print(f"**Chat Manager**:\n-- Escalating the {decision} decision to {self.service.ai_model_id}: {error}.")
+        response = await self._get_response(decision, chat_history, settings, escalated=True)
+        return result_type.model_validate_json(response.content)
+
     @override
     async def should_request_user_input(self, chat_history: ChatHistory) -> BooleanResult:
         """Provide concrete implementation for determining if user input is needed.
@@ -63,34 +186,43 @@ class AppFactoryChatManager(GroupChatManager):
         The manager will check if the conversation should be terminated after each agent message
         or human input (if applicable).
         """
+        should_terminate = await self._should_terminate(chat_history)
+        if self.session_log:
+            self.session_log.log_decision(self.current_round, "termination", should_terminate.result, should_terminate.reason)
+        return should_terminate
+
+    async def _should_terminate(self, chat_history: ChatHistory) -> BooleanResult:
+        self._pending_selection = None
         should_terminate = await super().should_terminate(chat_history)
+        if self.session_log:
+            self.session_log.log_round(self.current_round, chat_history)
         if should_terminate.result:
             return should_terminate
 
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.termination_prompt,
-                    KernelArguments()
-                ),
-            ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(role=AuthorRole.USER, content="Determine if the discussion should end."),
+        # The participants are only known after the first selection, so the first round is never fused.
+        # If the fast path can select the next speaker, only the termination is decided by the LLM.
+        if self.fused_decisions and self._participant_descriptions:
+            self._pending_selection = self._fast_select(chat_history, self._participant_descriptions)
+            if self._pending_selection is None:
+                return await self._decide(chat_history)
+
+        chat_history = await self._prepare_history(
+            chat_history,
+            self.termination_prompt,
+            KernelArguments(),
+            "Determine if the discussion should end.",
         )
 
-        response = await self.service.get_chat_message_content(
+        termination_with_reason = await self._get_routing_result(
+            "termination",
             chat_history,
-            settings=PromptExecutionSettings(
+            PromptExecutionSettings(
                 response_format=BooleanResult,
                 temperature=0.1,  # Low temperature for deterministic decisions
             ),
+            BooleanResult,
         )
 
-        termination_with_reason = BooleanResult.model_validate_json(response.content)
-
         print("**Chat Manager**:")
         print(f"-- Should terminate: {termination_with_reason.result}\n-- Reason: {termination_with_reason.reason}.")
 
@@ -105,32 +237,50 @@ class AppFactoryChatManager(GroupChatManager):
         """
         The manager will select the next agent to speak after each agent message if the conversation is not terminated.
         """
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.selection_prompt,
-                    KernelArguments(
-                        participants="\n".join([f"{k}: {v}" for k, v in participant_descriptions.items()]),
-                    ),
-                ),
+        selection = await self._select_next_agent(chat_history, participant_descriptions)
+        if self.session_log:
+            self.session_log.log_decision(self.current_round, "selection", selection.result, selection.reason)
+        return selection
+
+    async def _select_next_agent(
+        self,
+        chat_history: ChatHistory,
+        participant_descriptions: dict[str, str],
+    ) -> StringResult:
+        self._participant_descriptions = participant_descriptions
+
+        # A selection of the fast path or of a fused decision of this round. If there is one, the fast path was
+        # already asked while deciding on termination.
+        pending_selection, self._pending_selection = self._pending_selection, None
+
+        if pending_selection is None:
+            pending_selection = self._fast_select(chat_history, participant_descriptions)
+
+        if pending_selection and pending_selection.result in participant_descriptions:
+            print("**Chat Manager**:")
+            print(f"-- Next participant: {pending_selection.result}\n-- Reason: {pending_selection.reason}.")
+            return pending_selection
+
+        chat_history = await self._prepare_history(
+            chat_history,
+            self.selection_prompt,
+            KernelArguments(
+                participants="\n".join([f"{k}: {v}" for k, v in participant_descriptions.items()]),
             ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(role=AuthorRole.USER, content="Now select the next participant to speak."),
+            "Now select the next participant to speak.",
         )
 
-        response = await self.service.get_chat_message_content(
+        participant_name_with_reason = await self._get_routing_result(
+            "selection",
             chat_history,
-            settings=PromptExecutionSettings(
+            PromptExecutionSettings(
                 response_format=StringResult,
                 temperature=0.1,  # Low temperature for consistent agent selection
             ),
+            StringResult,
+            is_valid=lambda selection: selection.result in participant_descriptions,
         )
 
-        participant_name_with_reason = StringResult.model_validate_json(response.content)
-
         print("**Chat Manager**:")
         print(
             f"-- Next participant: {participant_name_with_reason.result}\n-- Reason: {participant_name_with_reason.reason}."
@@ -139,7 +289,57 @@ class AppFactoryChatManager(GroupChatManager):
         if participant_name_with_reason.result in participant_descriptions:
             return participant_name_with_reason
 
-        raise RuntimeError(f"Unknown participant selected: {response.content}.")
+        raise RuntimeError(f"Unknown participant selected: {participant_name_with_reason.result}.")
+
+    def _fast_select(self, chat_history: ChatHistory, participant_descriptions: dict[str, str]) -> StringResult | None:
+        """Helper to ask the speaker selector for the next speaker, if set."""
+        if not self.speaker_selector:
+            return None
+
+        started, start_counter = time.time(), time.perf_counter()
+        fast_selection = self.speaker_selector.select(chat_history, participant_descriptions)
+        if fast_selection and self.run_recorder:
+            self.run_recorder.record_manager("fast path selection", started, time.perf_counter() - start_counter)
+        counters = f"Fast path hits: {self.speaker_selector.hits}, misses: {self.speaker_selector.misses}"
+        if fast_selection:
+            print(f"**Chat Manager**:\n-- Fast path selection: {fast_selection.result}.\n-- {counters}.")
+        else:
+            print(f"**Chat Manager**:\n-- No fast path selection.\n-- {counters}.")
+        return fast_selection
+
+    async def _decide(self, chat_history: ChatHistory) -> BooleanResult:
+        """Decide whether the discussion should end and who speaks next with a single structured-output call.
+
+        The selection is kept until select_next_agent is called for the same round.
+        """
+        chat_history = await self._prepare_history(
+            chat_history,
+            f"{self.termination_prompt}\n{self.fused_decision_prompt}",
+            KernelArguments(
+                participants="\n".join([f"{k}: {v}" for k, v in self._participant_descriptions.items()]),
+            ),
+            "Determine if the discussion should end and, if not, select the next participant to speak.",
+        )
+
+        decision = await self._get_routing_result(
+            "fused",
+            chat_history,
+            PromptExecutionSettings(
+                response_format=ManagerDecision,
+                temperature=0.1,  # Low temperature for deterministic decisions
+            ),
+            ManagerDecision,
+            is_valid=lambda decision: decision.should_terminate or decision.next_agent in self._participant_descriptions,
+        )
+
+        print("**Chat Manager**:")
+        print(f"-- Should terminate: {decision.should_terminate}\n-- Reason: {decision.termination_reason}.")
+
+        self._pending_selection = None
+        if not decision.should_terminate:
+            self._pending_selection = StringResult(result=decision.next_agent, reason=decision.selection_reason)
+
+        return BooleanResult(result=decision.should_terminate, reason=decision.termination_reason)
 
     @override
     async def filter_results(
@@ -152,23 +352,17 @@ class AppFactoryChatManager(GroupChatManager):
         if not chat_history.messages:
             raise RuntimeError("No messages in the chat history.")
 
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.result_filter_prompt,
-                    KernelArguments(),
-                ),
-            ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(role=AuthorRole.USER, content="Please summarize the discussion."),
+        chat_history = await self._prepare_history(
+            chat_history,
+            self.result_filter_prompt,
+            KernelArguments(),
+            "Please summarize the discussion.",
         )
 
-        response = await self.service.get_chat_message_content(
+        response = await self._get_response(
+            "summary",
             chat_history,
-            settings=PromptExecutionSettings(
+            PromptExecutionSettings(
                 response_format=StringResult,
                 temperature=0.2,  # Slightly higher for creative summarization
             ),
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import override
+
+from semantic_kernel.agents import Agent, GroupChatOrchestration
+from semantic_kernel.agents.orchestration.group_chat import (
+    GroupChatAgentActor,
+    GroupChatManager,
+    GroupChatRequestMessage,
+    GroupChatResponseMessage,
+    GroupChatStartMessage,
+)
+from semantic_kernel.agents.runtime.core.core_runtime import CoreRuntime
+from semantic_kernel.agents.runtime.core.message_context import MessageContext
+from semantic_kernel.agents.runtime.core.routed_agent import message_handler
+from semantic_kernel.agents.runtime.core.topic import TopicId
+from semantic_kernel.agents.orchestration.orchestration_base import DefaultTypeAlias
+from semantic_kernel.contents import ChatMessageContent, StreamingChatMessageContent
+from semantic_kernel.filters import FilterTypes
+
+from context_filter import ContextFilter
+from run_metrics import RunRecorder
+from workflow_graph import ParallelGroupChatManagerActor, WorkflowGraph
+
+
+# A response processor receives an agent response before it is shared with the group chat
+# and returns the message that is shared instead.
+ResponseProcessor = Callable[[ChatMessageContent], Awaitable[ChatMessageContent]]
+
+
+class AppFactoryAgentActor(GroupChatAgentActor):
+    """A group chat agent actor that passes agent responses through response processors before sharing them.
+
+    If a context filter is given, the messages of the group chat that the agent does not need are replaced with
+    placeholders before they are added to its thread.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        internal_topic_type: str,
+        response_processors: list[ResponseProcessor],
+        run_recorder: RunRecorder | None = None,
+        context_filter: ContextFilter | None = None,
+        **kwargs,
+    ):
+        super().__init__(agent, internal_topic_type, **kwargs)
+        self._response_processors = response_processors
+        self._run_recorder = run_recorder
+        self._context_filter = context_filter
+        # Time of the first streamed chunk and time spent rendering chunks of the current response
+        self._first_chunk_time: float | None = None
+        self._render_time = 0.0
+
+    @override
+    async def _call_streaming_agent_response_callback(self, message_chunk: StreamingChatMessageContent, is_final: bool) -> None:
+        if self._first_chunk_time is None:
+            self._first_chunk_time = time.perf_counter()
+        started = time.perf_counter()
+        await super()._call_streaming_agent_response_callback(message_chunk, is_final)
+        self._render_time += time.perf_counter() - started
+
+    @message_handler
+    async def _handle_start_message(self, message: GroupChatStartMessage, ctx: MessageContext) -> None:
+        if self._context_filter:
+            # A resumed session starts with the logged chat history instead of the task
+            if isinstance(message.body, list):
+                message = GroupChatStartMessage(body=[self._context_filter.apply(item) for item in message.body])
+            else:
+                message = GroupChatStartMessage(body=self._context_filter.apply(message.body))
+        await super()._handle_start_message(message, ctx)
+
+    @message_handler
+    async def _handle_response_message(self, message: GroupChatResponseMessage, ctx: MessageContext) -> None:
+        if self._context_filter:
+            message = GroupChatResponseMessage(body=self._context_filter.apply(message.body))
+        await super()._handle_response_message(message, ctx)
+
+    @message_handler
+    async def _handle_request_message(self, message: GroupChatRequestMessage, ctx: MessageContext) -> None:
+        if message.agent_name != self._agent.name:
+            return
+
+        recorder = self._run_recorder
+        if recorder:
+            recorder.start_agent(self._agent.name)
+        self._first_chunk_time, self._render_time = None, 0.0
+        started, start_counter = time.time(), time.perf_counter()
+
+        response = await self._invoke_agent()
+
+        if recorder:
+            recorder.record_agent(
+                self._agent.name,
+                started,
+                time.perf_counter() - start_counter,
+                first_token_seconds=self._first_chunk_time - start_counter if self._first_chunk_time else None,
+                render_seconds=self._render_time,
+                response=response,
+                # Foundry agents run on the model deployment of their definition
+                model=getattr(getattr(self._agent, "definition", None), "model", None),
+            )
+            started, start_counter = time.time(), time.perf_counter()
+
+        for process in self._response_processors:
+            response = await process(response)
+
+        if recorder and self._response_processors:
+            recorder.record("processing", started, time.perf_counter() - start_counter, agent=self._agent.name)
+
+        await self.publish_message(
+            GroupChatResponseMessage(body=response),
+            TopicId(self._internal_topic_type, self.id.key),
+            cancellation_token=ctx.cancellation_token,
+        )
+
+
+class AppFactoryGroupChatOrchestration(GroupChatOrchestration):
+    """A group chat orchestration with hooks to process agent responses before they are shared.
+
+    If a run recorder is given, the latency and token usage of the agents and their tool calls are recorded.
+    If a workflow graph is given, independent steps of the workflow run at the same time.
+    If context filters are given, each agent with a filter only receives the messages of the group chat it needs in full.
+    """
+
+    def __init__(
+        self,
+        members: list[Agent],
+        manager: GroupChatManager,
+        response_processors: list[ResponseProcessor] | None = None,
+        run_recorder: RunRecorder | None = None,
+        workflow_graph: WorkflowGraph | None = None,
+        context_filters: dict[str, ContextFilter] | None = None,
+        **kwargs,
+    ) -> None:
+        self._response_processors = response_processors or []
+        self._run_recorder = run_recorder
+        self._workflow_graph = workflow_graph
+        self._context_filters = context_filters or {}
+        super().__init__(members=members, manager=manager, **kwargs)
+        # Record the duration of every tool call of the agents
+        if run_recorder:
+            for agent in members:
+                agent.kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, run_recorder.function_invocation_filter)
+
+    @override
+    async def _register_members(
+        self,
+        runtime: CoreRuntime,
+        internal_topic_type: str,
+        exception_callback: Callable[[BaseException], None],
+    ) -> None:
+        """Register the agents with actors that apply the response processors and context filters."""
+        await asyncio.gather(*[
+            AppFactoryAgentActor.register(
+                runtime,
+                self._get_agent_actor_type(agent, internal_topic_type),
+                lambda agent=agent: AppFactoryAgentActor(
+                    agent,
+                    internal_topic_type,
+                    response_processors=self._response_processors,
+                    run_recorder=self._run_recorder,
+                    context_filter=self._context_filters.get(agent.name),
+                    exception_callback=exception_callback,
+                    agent_response_callback=self._agent_response_callback,
+                    streaming_agent_response_callback=self._streaming_agent_response_callback,
+                ),
+            )
+            for agent in self._members
+        ])
+
+    @override
+    async def _register_manager(
+        self,
+        runtime: CoreRuntime,
+        internal_topic_type: str,
+        exception_callback: Callable[[BaseException], None],
+        result_callback: Callable[[DefaultTypeAlias], Awaitable[None]] | None = None,
+    ) -> None:
+        """Register the group chat manager, with an actor that runs independent steps in parallel if a workflow graph is given."""
+        if self._workflow_graph is None:
+            await super()._register_manager(runtime, internal_topic_type, exception_callback, result_callback)
+            return
+        await ParallelGroupChatManagerActor.register(
+            runtime,
+            self._get_manager_actor_type(internal_topic_type),
+            lambda: ParallelGroupChatManagerActor(
+                self._manager,
+                internal_topic_type=internal_topic_type,
+                participant_descriptions={agent.name: agent.description for agent in self._members},
+                workflow_graph=self._workflow_graph,
+                exception_callback=exception_callback,
+                result_callback=result_callback,
+            ),
+        )
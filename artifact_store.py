@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+import hashlib
+import os
+import re
+
+from semantic_kernel.contents import ChatMessageContent
+
+
+CODE_BLOCK_PATTERN = re.compile(r"```([^\n`]*)\n(.*?)```", re.DOTALL)
+FILE_NAME_PATTERN = re.compile(r"([\w\-./]+\.(?:html|htm|css|js|json|md|txt|svg))\b", re.IGNORECASE)
+HANDLE_PATTERN = re.compile(r"\[artifact (?P<name>[^|\]]+?) \| (?P<size>\d+) bytes \| sha256:(?P<hash>[0-9a-f]{12})\]")
+
+# File names assumed for code blocks without a file name hint
+DEFAULT_FILE_NAMES = {
+    "html": "index.html",
+    "css": "styles.css",
+    "javascript": "script.js",
+    "js": "script.js",
+}
+
+# Languages of code blocks that hold a unified diff instead of file content
+PATCH_LANGUAGES = ("diff", "patch")
+
+
+@dataclass
+class CodeBlock:
+    """A fenced code block found in a message."""
+
+    name: str | None
+    language: str
+    content: str
+    start: int
+    end: int
+    # Whether the file name is only assumed from the language of the block
+    named_by_language: bool = False
+
+
+def is_full_document(content: str) -> bool:
+    """Whether the content of a code block is a complete HTML document rather than a snippet."""
+    start = content.lstrip()[:100].lower()
+    return start.startswith(("<!doctype html", "<html"))
+
+
+def extract_code_blocks(text: str) -> list[CodeBlock]:
+    """Find all fenced code blocks in a text along with the file names they are meant for.
+
+    The file name is taken from the fence info string (e.g. ```html index.html), from the closest line
+    above the block that mentions a file name, or from the language of the block.
+    """
+    blocks = []
+    previous_end = 0
+    for match in CODE_BLOCK_PATTERN.finditer(text):
+        info = match.group(1).strip().split()
+        language = info[0].lower() if info else ""
+        name = next((part for part in info if FILE_NAME_PATTERN.fullmatch(part)), None)
+        if name is None:
+            preceding_lines = text[previous_end:match.start()].strip().splitlines()
+            if preceding_lines:
+                names = FILE_NAME_PATTERN.findall(preceding_lines[-1])
+                name = names[-1] if names else None
+        named_by_language = name is None and language in DEFAULT_FILE_NAMES
+        if name is None:
+            name = DEFAULT_FILE_NAMES.get(language)
+        blocks.append(CodeBlock(
+            name=name, language=language, content=match.group(2), start=match.start(), end=match.end(),
+            named_by_language=named_by_language,
+        ))
+        previous_end = match.end()
+    return blocks
+
+
+class ArtifactStore:
+    """Stores code blocks of agent messages by content hash in the session directory.
+
+    In the group chat, the code blocks are replaced by short handles, e.g.
+    [artifact index.html | 2048 bytes | sha256:0123456789ab], which tools resolve back into the content.
+    Handles of patches keep the language as extension, e.g. [artifact script.js.diff | ...], so that they
+    are not mistaken for file content, and snippets whose file name is only assumed from their language are
+    named snippetN.<language>. Only the code of the Developer is replaced, the test results and logs of the
+    other agents are shared as they are.
+    """
+
+    def __init__(self, session_dir: str, agent_name: str = "Developer"):
+        self.artifact_dir = os.path.join(session_dir, ".artifacts")
+        self.agent_name = agent_name
+
+    def put(self, content: str, name: str) -> str:
+        """Store content and return its handle."""
+        data = content.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        path = os.path.join(self.artifact_dir, content_hash)
+        if not os.path.exists(path):
+            with open(path, 'wb') as file:
+                file.write(data)
+        return f"[artifact {name} | {len(data)} bytes | sha256:{content_hash[:12]}]"
+
+    def get(self, short_hash: str) -> str:
+        """Return the content of an artifact by the hash prefix of its handle."""
+        if os.path.isdir(self.artifact_dir):
+            for file_name in os.listdir(self.artifact_dir):
+                if file_name.startswith(short_hash):
+                    with open(os.path.join(self.artifact_dir, file_name), 'rb') as file:
+                        return file.read().decode("utf-8")
+        raise KeyError(f"Unknown artifact sha256:{short_hash}")
+
+    def resolve(self, text: str) -> str:
+        """Replace all artifact handles in a text with the content they refer to."""
+        return HANDLE_PATTERN.sub(lambda match: self.get(match.group("hash")), text)
+
+    def replace_code_blocks(self, text: str) -> tuple[str, int]:
+        """Store all code blocks of a text and replace them with handles.
+
+        Returns the new text and the number of characters saved.
+        """
+        blocks = extract_code_blocks(text)
+        if not blocks:
+            return text, 0
+
+        parts = []
+        position = 0
+        for index, block in enumerate(blocks):
+            parts.append(text[position:block.start])
+            parts.append(self.put(block.content, self._handle_name(block, index)))
+            position = block.end
+        parts.append(text[position:])
+        new_text = "".join(parts)
+        return new_text, len(text) - len(new_text)
+
+    @staticmethod
+    def _handle_name(block: CodeBlock, index: int) -> str:
+        if block.language in PATCH_LANGUAGES:
+            return f"{block.name or f'patch{index + 1}'}.{block.language}"
+        # A snippet such as a single CSS rule must not be written as the whole styles.css
+        if block.name and (not block.named_by_language or is_full_document(block.content)):
+            return block.name
+        return f"snippet{index + 1}.{block.language or 'txt'}"
+
+    async def process(self, message: ChatMessageContent) -> ChatMessageContent:
+        """Response processor that replaces the code blocks of a Developer response with handles."""
+        if message.name != self.agent_name:
+            return message
+
+        content = message.content or ""
+        new_content, saved = self.replace_code_blocks(content)
+        if saved <= 0:
+            return message
+
+        print(f"\n**Artifact Store**: Replaced code of {message.name} with handles ({saved} characters saved).")
+        return ChatMessageContent(
+            role=message.role,
+            name=message.name,
+            content=new_content,
+            metadata=message.metadata,
+        )
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+import os
+import sys
+import time
+
+from azure.identity.aio import DefaultAzureCredential
+from opentelemetry import trace
+from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
+from semantic_kernel.agents.runtime import InProcessRuntime
+
+from agent_registry import AgentRegistry
+from app_factory import (
+    STARTUP_PROFILE,
+    AgentManager,
+    build_parser,
+    create_chat_service,
+    create_orchestration,
+    create_routing_service,
+    finish_session_dir,
+    task_prompt,
+)
+from artifact_store import ArtifactStore
+from browser_pool import BrowserPool
+from call_server import CallServer
+from model_tiers import ModelTiers
+from run_metrics import RunRecorder
+from session_log import SessionLog
+
+
+@dataclass
+class TaskResult:
+    """The outcome of one app request of a batch."""
+
+    index: int
+    task: str
+    session_dir: str
+    status: str = "pending"
+    seconds: float = 0.0
+    rounds: int = 0
+    error: str | None = None
+
+
+async def read_tasks(path: str, queue: asyncio.Queue, workers: int):
+    """Put the tasks of a file, or of stdin as they arrive, on the queue, one task per line.
+
+    Empty lines and lines starting with # are skipped. A None per worker marks the end of the tasks.
+    """
+    file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        index = 0
+        while True:
+            line = await asyncio.to_thread(file.readline)
+            if not line:
+                break
+            task = line.strip()
+            if not task or task.startswith("#"):
+                continue
+            index += 1
+            # Blocks while all workers are busy, so that a stream is read as fast as it is processed
+            await queue.put((index, task))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+        for _ in range(workers):
+            await queue.put(None)
+
+
+class BatchRunner:
+    """Runs the app requests of a batch with bounded concurrency in one process.
+
+    The agent definitions, the runtime, the call server, the browser pool and the chat manager services are
+    shared by all sessions. Each session gets its own session directory, agents with session-specific plugins,
+    chat manager and chat history.
+    """
+
+    def __init__(self, args: argparse.Namespace, client, definitions: list, registry: AgentRegistry | None,
+                 browser_pool: BrowserPool | None, call_server: CallServer, runtime: InProcessRuntime,
+                 model_tiers: ModelTiers):
+        self.args = args
+        self.client = client
+        self.definitions = definitions
+        self.registry = registry
+        self.browser_pool = browser_pool
+        self.call_server = call_server
+        self.runtime = runtime
+        self.service = create_chat_service()
+        self.routing_service = create_routing_service(model_tiers)
+        self.model_tiers = model_tiers
+        self.results: list[TaskResult] = []
+        # Agent and manager records of all sessions, for the comparison of the model tiers
+        self.records: list[dict] = []
+        self.batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    async def run_task(self, index: int, task: str) -> TaskResult:
+        session_dir = os.path.abspath(os.path.join("sessions", f"{self.batch_id}_{index:03d}"))
+        os.makedirs(session_dir, exist_ok=True)
+        result = TaskResult(index=index, task=task, session_dir=session_dir, status="running")
+        self.results.append(result)
+        print(f"**Batch**: Task {index} started: {task}")
+
+        agent_manager = AgentManager(
+            registry=self.registry,
+            browser_pool=self.browser_pool,
+            call_server=self.call_server,
+            definitions=self.definitions,
+        )
+        run_recorder = RunRecorder(
+            path=self.args.metrics_file,
+            tracer=trace.get_tracer("app_factory") if self.args.trace else None,
+        )
+        session_log = SessionLog(session_dir)
+        session_log.log_start(task)
+        start_time = time.perf_counter()
+        renderer = None
+        cancelled = False
+        try:
+            artifact_store = None if self.args.no_artifact_handles else ArtifactStore(session_dir)
+            agents = await agent_manager.create_agents(self.client, session_dir, artifact_store=artifact_store)
+            orchestration, renderer = create_orchestration(
+                self.args, agents, agent_manager.agent_colors, session_dir, artifact_store, self.service, run_recorder,
+                session_log=session_log, routing_service=self.routing_service,
+            )
+            orchestration_result = await orchestration.invoke(task=task_prompt(task, agents), runtime=self.runtime)
+            try:
+                value = await orchestration_result.get(timeout=self.args.task_timeout)
+            except TimeoutError:
+                # Cancelling does not stop agent calls that are in flight on the shared runtime
+                orchestration_result.cancel()
+                cancelled = True
+                raise
+            session_log.log_end(value.metadata.get("termination_reason", ""))
+            result.status = "completed"
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        finally:
+            if renderer:
+                await renderer.close()
+            result.seconds = time.perf_counter() - start_time
+            result.rounds = run_recorder.round
+            self.records.extend(run_recorder.records)
+            run_recorder.close()
+            # The agent definitions are shared and kept, but the browser may still be driven by a stale QA turn
+            await agent_manager.cleanup(self.client, reuse_browser=not cancelled)
+            # Unfinished sessions are kept, so that they can be resumed with app_factory.py --resume
+            if not self.args.keep_sessions:
+                finish_session_dir(session_dir, result.status == "completed", archive=self.args.archive_sessions)
+
+        print(f"**Batch**: Task {index} {result.status} in {result.seconds:.1f}s after {result.rounds} rounds"
+              + (f" -- {result.error}" if result.error else ""))
+        return result
+
+    async def worker(self, queue: asyncio.Queue):
+        while (item := await queue.get()) is not None:
+            await self.run_task(*item)
+
+    async def run(self, path: str) -> list[TaskResult]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.args.concurrency)
+        start_time = time.perf_counter()
+        await asyncio.gather(
+            read_tasks(path, queue, self.args.concurrency),
+            *(self.worker(queue) for _ in range(self.args.concurrency)),
+        )
+        self.print_report(time.perf_counter() - start_time)
+        return self.results
+
+    def print_report(self, elapsed: float):
+        completed = sum(1 for result in self.results if result.status == "completed")
+        print("**Batch**:")
+        for result in sorted(self.results, key=lambda result: result.index):
+            location = result.session_dir if self.args.keep_sessions or result.status != "completed" else ("archived" if self.args.archive_sessions else "deleted")
+            print(f"-- Task {result.index}: {result.status}, {result.seconds:.1f}s, {result.rounds} rounds, {location}"
+                  + (f", {result.error}" if result.error else ""))
+        print(f"-- {completed} of {len(self.results)} tasks completed in {elapsed:.1f}s "
+              f"with concurrency {self.args.concurrency}")
+        if elapsed > 0 and self.results:
+            print(f"-- Throughput: {len(self.results) / elapsed * 3600:.1f} tasks/h, "
+                  f"sequential time: {sum(result.seconds for result in self.results):.1f}s")
+        if self.model_tiers.enabled:
+            self.model_tiers.print_comparison(self.records)
+
+
+async def main(args: argparse.Namespace) -> int:
+    # Streamed responses of concurrent sessions would be interleaved
+    if args.concurrency > 1:
+        args.quiet = True
+
+    async with (
+        DefaultAzureCredential() as creds,
+        AzureAIAgent.create_client(credential=creds) as client,
+    ):
+        registry = None if args.no_agent_cache else AgentRegistry(scope=AzureAIAgentSettings().endpoint)
+        browser_pool = None if args.no_browser_pool else BrowserPool(size=args.concurrency, max_uses=args.browser_max_uses)
+        model_tiers = ModelTiers.from_env(args.small_model_roles)
+        provisioner = AgentManager(registry=registry, model_tiers=model_tiers)
+        with STARTUP_PROFILE.phase("Provision agents"):
+            definitions = await provisioner.provision(client)
+
+        # A single call server on port 8080 handles the calls of all sessions, it is started by the first call
+        call_server = CallServer()
+
+        runtime = InProcessRuntime()
+        runtime.start()
+        try:
+            if browser_pool:
+                with STARTUP_PROFILE.phase("Start browser pool"):
+                    await browser_pool.start()
+            STARTUP_PROFILE.mark("ready, reading the tasks")
+            if args.profile_startup:
+                STARTUP_PROFILE.print_report()
+            runner = BatchRunner(args, client, definitions, registry, browser_pool, call_server, runtime, model_tiers)
+            results = await runner.run(args.tasks)
+            await runtime.stop_when_idle()
+        finally:
+            await provisioner.cleanup(client)
+            if browser_pool:
+                await browser_pool.close()
+    return 0 if all(result.status == "completed" for result in results) else 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = build_parser("Build a batch of web apps with a team of AI agents.")
+    parser.add_argument(
+        "tasks",
+        help="File with one app request per line, or - to read the requests from stdin as they arrive.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=2,
+        help="Number of sessions that run at the same time.",
+    )
+    parser.add_argument(
+        "--task-timeout",
+        type=float,
+        default=1800,
+        help="Seconds after which a session is cancelled and reported as failed.",
+    )
+    parser.add_argument(
+        "--no-browser-pool",
+        action="store_true",
+        help="Start the browser of each session on demand instead of taking a warm browser from the pool.",
+    )
+    parser.add_argument(
+        "--browser-max-uses",
+        type=int,
+        default=10,
+        help="Number of sessions after which a pooled browser is replaced with a fresh one.",
+    )
+    parser.add_argument(
+        "--keep-sessions",
+        action="store_true",
+        help="Keep the session directories with the built apps instead of deleting them.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        sys.exit(asyncio.run(main(args)))
+    except KeyboardInterrupt:
+        print("\nBatch cancelled by user.")
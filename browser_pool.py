@@ -0,0 +1,206 @@
+from dataclasses import dataclass, field
+import asyncio
+import os
+import shutil
+import time
+
+from semantic_kernel.connectors.mcp import MCPStdioPlugin
+
+
+# Pinned version of the Playwright MCP server, so that npx does not resolve @latest on every start
+PLAYWRIGHT_MCP_VERSION = os.getenv("PLAYWRIGHT_MCP_VERSION", "0.0.32")
+PLAYWRIGHT_MCP_BINARY = "mcp-server-playwright"
+
+
+def browser_command() -> tuple[str, list[str]]:
+    """Get the command of the Playwright MCP server, preferring an installed binary over npx."""
+    # Each browser context is kept in memory, so that a closed browser starts with a clean context
+    args = ["--browser", "msedge", "--caps", "vision", "--isolated"]
+    binary = shutil.which(PLAYWRIGHT_MCP_BINARY)
+    if binary:
+        return binary, args
+    return "npx", ["--yes", f"@playwright/mcp@{PLAYWRIGHT_MCP_VERSION}", *args]
+
+
+@dataclass
+class PooledBrowser:
+    """A browser MCP server of the pool and the task that owns its connection."""
+
+    plugin: MCPStdioPlugin
+    task: asyncio.Task | None = None
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    stop: asyncio.Event = field(default_factory=asyncio.Event)
+    error: BaseException | None = None
+    uses: int = 0
+
+
+class BrowserPool:
+    """A pool of warm Playwright MCP browser plugins that are reused across sessions.
+
+    Each browser is connected and closed by its own task, as the MCP connection has to be closed by the task
+    that opened it. Browsers are warmed up by opening a blank page, checked before they are handed out, closed
+    on release so that the next QA agent gets a clean browser context, and replaced after max_uses sessions.
+    """
+
+    def __init__(self, size: int = 1, max_uses: int = 10, health_check_timeout: float = 10):
+        self.size = size
+        self.max_uses = max_uses
+        self.health_check_timeout = health_check_timeout
+        self._idle: asyncio.Queue[PooledBrowser] = asyncio.Queue()
+        self._in_use: dict[int, PooledBrowser] = {}
+        self._browsers: list[PooledBrowser] = []
+        # Replacements of recycled browsers that are warming up
+        self._refills: set[asyncio.Task] = set()
+        self._started = False
+        # Set while the pool is closing, so that released browsers are not warmed up again
+        self._closing = False
+
+    async def _run(self, browser: PooledBrowser):
+        """Keep a browser connected until it is stopped."""
+        try:
+            await browser.plugin.connect()
+        except Exception as e:
+            browser.error = e
+            browser.ready.set()
+            await self._close_plugin(browser.plugin)
+            return
+        try:
+            await self._warm_up(browser.plugin)
+        except Exception as e:
+            # The QA agent gets the same error from its first tool call
+            print(f"**Browser Pool**: Failed to warm up browser: {e}")
+        browser.ready.set()
+        await browser.stop.wait()
+        await self._close_plugin(browser.plugin)
+
+    @staticmethod
+    async def _close_plugin(plugin: MCPStdioPlugin):
+        try:
+            await plugin.close()
+        except Exception as e:
+            print(f"**Browser Pool**: Failed to close browser plugin: {e}")
+
+    @staticmethod
+    async def _warm_up(plugin: MCPStdioPlugin):
+        """Launch the browser, so that the first tool call of the QA agent does not have to."""
+        await plugin.call_tool("browser_navigate", url="about:blank")
+
+    def _spawn(self) -> PooledBrowser:
+        command, args = browser_command()
+        browser = PooledBrowser(
+            plugin=MCPStdioPlugin(
+                name="BrowserPlugin",
+                description="A plugin for browser automation.",
+                command=command,
+                args=args,
+            )
+        )
+        browser.task = asyncio.create_task(self._run(browser))
+        self._browsers.append(browser)
+        return browser
+
+    async def _add(self) -> PooledBrowser | None:
+        """Start a browser and add it to the idle browsers once it is warm."""
+        browser = self._spawn()
+        await browser.ready.wait()
+        if browser.error:
+            print(f"**Browser Pool**: Failed to start browser: {browser.error}")
+            self._browsers.remove(browser)
+            return None
+        self._idle.put_nowait(browser)
+        return browser
+
+    async def start(self):
+        """Warm up the browsers of the pool."""
+        if self._started:
+            return
+        self._started = True
+        start_time = time.perf_counter()
+        browsers = await asyncio.gather(*(self._add() for _ in range(self.size)))
+        print(f"**Browser Pool**: {sum(1 for browser in browsers if browser)} of {self.size} browsers warm in {time.perf_counter() - start_time:.2f}s")
+
+    async def _is_healthy(self, browser: PooledBrowser) -> bool:
+        if browser.task.done() or not browser.plugin.session:
+            return False
+        try:
+            await asyncio.wait_for(browser.plugin.session.send_ping(), self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def acquire(self) -> MCPStdioPlugin:
+        """Get a warm, healthy browser plugin. A new browser is started if none is idle."""
+        await self.start()
+        while True:
+            if self._idle.empty():
+                browser = self._spawn()
+                await browser.ready.wait()
+                if browser.error:
+                    self._browsers.remove(browser)
+                    raise browser.error
+            else:
+                browser = self._idle.get_nowait()
+            if await self._is_healthy(browser):
+                break
+            print("**Browser Pool**: Replacing unhealthy browser")
+            await self._retire(browser)
+
+        browser.uses += 1
+        self._in_use[id(browser.plugin)] = browser
+        return browser.plugin
+
+    async def release(self, plugin: MCPStdioPlugin, reuse: bool = True):
+        """Return a browser plugin to the pool, with a clean browser context for the next session.
+
+        A browser that may still be in use, e.g. by the QA agent of a cancelled session, is replaced instead of reused.
+        """
+        browser = self._in_use.pop(id(plugin), None)
+        if browser is None:
+            return
+        if self._closing:
+            await self._retire(browser)
+            return
+        if not reuse:
+            print("**Browser Pool**: Replacing browser of a cancelled session")
+            await self._retire(browser)
+            self._refill()
+            return
+        if browser.uses >= self.max_uses:
+            print(f"**Browser Pool**: Recycling browser after {browser.uses} uses")
+            await self._retire(browser)
+            self._refill()
+            return
+        try:
+            # Closing the browser discards the in-memory context, the next page opens a fresh one
+            await plugin.call_tool("browser_close")
+            await self._warm_up(plugin)
+        except Exception:
+            await self._retire(browser)
+            self._refill()
+            return
+        self._idle.put_nowait(browser)
+
+    def _refill(self):
+        """Start a replacement browser in the background."""
+        task = asyncio.create_task(self._add())
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+
+    async def _retire(self, browser: PooledBrowser):
+        browser.stop.set()
+        await browser.task
+        if browser in self._browsers:
+            self._browsers.remove(browser)
+
+    async def close(self):
+        """Close all browsers of the pool."""
+        self._closing = True
+        await asyncio.gather(*self._refills, return_exceptions=True)
+        for browser in self._browsers:
+            browser.stop.set()
+        await asyncio.gather(*(browser.task for browser in self._browsers), return_exceptions=True)
+        self._browsers.clear()
+        self._in_use.clear()
+        self._idle = asyncio.Queue()
+        self._started = False
+        self._closing = False
@@ -1,15 +1,20 @@
-from flask import Flask, Response, request
-from azure.communication.callautomation import (
-    CallAutomationClient,
-    CallConnectionClient,
-    PhoneNumberIdentifier,
-    RecognizeInputType,
-    TextSource)
-from azure.core.messaging import CloudEvent
-from azure.identity import DefaultAzureCredential
+from __future__ import annotations
+
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
-from typing import Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+# The web frameworks and the ACS SDK are imported when they are first used, as most runs never reach a call
+if TYPE_CHECKING:
+    from aiohttp import web
+    from azure.communication.callautomation import CallAutomationClient, CallConnectionClient, PhoneNumberIdentifier
+    from azure.core.messaging import CloudEvent
+    from flask import Flask
 
 # Load environment variables from .env file
 load_dotenv()
@@ -32,16 +37,52 @@ SPEECH_TO_TEXT_VOICE = os.getenv("SPEECH_TO_TEXT_VOICE", "en-US-NancyNeural")
 FOUNDRY_PROJECT_ENDPOINT = os.getenv("AZURE_AI_AGENT_ENDPOINT")
 COGNITIVE_SERVICES_ENDPOINT = os.getenv("COGNITIVE_SERVICES_ENDPOINT")
 
+# Server mode: 'flask' handles callbacks inline, 'async' acknowledges them immediately and processes them in workers
+CALL_SERVER_MODE = os.getenv("CALL_SERVER_MODE", "flask")
+CALL_SERVER_WORKERS = int(os.getenv("CALL_SERVER_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+# Order of the callback events of a call. Events for an earlier stage than the current one are out of order.
+EVENT_STAGES = {
+    "Microsoft.Communication.CallConnected": 1,
+    "Microsoft.Communication.RecognizeCompleted": 2,
+    "Microsoft.Communication.RecognizeFailed": 2,
+    "Microsoft.Communication.PlayCompleted": 3,
+    "Microsoft.Communication.PlayFailed": 3,
+    "Microsoft.Communication.CallDisconnected": 4,
+}
+
+
+@dataclass
+class CallState:
+    """The state of a single call, keyed by its call connection id."""
+
+    call_connection_id: str
+    start_message: str
+    end_message: str
+    target_phone_number: str
+    target_participant: PhoneNumberIdentifier
+    status: str = 'active'  # 'idle', 'active', 'completed', 'failed'
+    response: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+    ended_at: Optional[float] = None
+    # Futures on the event loops of the callers waiting for the call to end
+    waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = field(default_factory=list)
+    # Callback events already processed, to drop duplicate and out-of-order deliveries
+    seen_event_ids: set[str] = field(default_factory=set)
+    stage: int = 0
+    connection: Optional[CallConnectionClient] = None
+
+
 class CallServer:
-    def __init__(self):
-        self.start_message = "dummy start message"
-        self.end_message = "dummy end message"
-        self.call_automation_client = CallAutomationClient(
-            endpoint=ACS_ENDPOINT,
-            credential=DefaultAzureCredential()
-        )
-        self.app = Flask(__name__)
-        self.setup_routes()
+    def __init__(self, retention_seconds: float = 600, max_call_seconds: float = 900,
+                 call_automation_client: Optional[CallAutomationClient] = None):
+        # A different client, e.g. the local simulator, can be passed in instead of the ACS client.
+        # The ACS client and the Flask app are created on first use.
+        self._call_automation_client = call_automation_client
+        self._app: Optional[Flask] = None
+        self._server_thread: Optional[threading.Thread] = None
 
         # Derive cognitive services endpoint from Foundry project endpoint if not set
         if COGNITIVE_SERVICES_ENDPOINT:
@@ -53,42 +94,144 @@ class CallServer:
                         .replace(".services.ai.azure.com", ".cognitiveservices.azure.com")
                     + "/"
             )
-        
-        
-        # Single call management
-        self.current_call_id: Optional[str] = None
-        self.call_response: Optional[str] = None
-        self.call_status: str = 'idle'  # 'idle', 'active', 'completed', 'failed'
-
 
-    def setup_routes(self):
-        """Setup all Flask routes"""
-        self.app.route('/api/callbacks', methods=['POST'])(self.callback_events_handler)
-
-
-    def get_call_response(self) -> Optional[str]:
-        """Get the response from the current call"""
-        return self.call_response
 
+        # Call management, keyed by call connection id.
+        # Callbacks arrive on the Flask thread, so all access to the calls goes through the lock.
+        self.calls: dict[str, CallState] = {}
+        self._lock = threading.Lock()
+        # Ended calls are kept this long for late readers, active calls are given up after max_call_seconds
+        self.retention_seconds = retention_seconds
+        self.max_call_seconds = max_call_seconds
+        # Event queues of the async server mode, one per worker
+        self._event_queues: list[asyncio.Queue] = []
+
+
+    @property
+    def call_automation_client(self) -> CallAutomationClient:
+        """The ACS call automation client, created on first use"""
+        with self._lock:
+            if self._call_automation_client is None:
+                from azure.communication.callautomation import CallAutomationClient
+                from azure.identity import DefaultAzureCredential
+
+                self._call_automation_client = CallAutomationClient(
+                    endpoint=ACS_ENDPOINT,
+                    credential=DefaultAzureCredential()
+                )
+            return self._call_automation_client
 
-    def get_call_status(self) -> str:
-        """Get the status of the current call"""
-        return self.call_status
 
+    @property
+    def app(self) -> Flask:
+        """The Flask app of the callback server, created on first use"""
+        if self._app is None:
+            from flask import Flask
 
-    def is_call_active(self) -> bool:
-        """Check if there's an active call"""
-        return self.call_status == 'active'
+            self._app = Flask(__name__)
+            self.setup_routes()
+        return self._app
 
 
-    def _store_response(self, response: str, status: str = 'completed'):
-        """Store the response for the current call"""
-        self.call_response = response
-        self.call_status = status
+    def setup_routes(self):
+        """Setup all Flask routes"""
+        self.app.route('/api/callbacks', methods=['POST'])(self.callback_events_handler)
 
 
-    def recognize_speech(self, call_connection_client: CallConnectionClient, 
+    def get_call(self, call_connection_id: str) -> Optional[CallState]:
+        """Get the state of a call"""
+        with self._lock:
+            return self.calls.get(call_connection_id)
+
+
+    def get_call_response(self, call_connection_id: str) -> Optional[str]:
+        """Get the response from a call"""
+        call = self.get_call(call_connection_id)
+        return call.response if call else None
+
+
+    def get_call_status(self, call_connection_id: str) -> str:
+        """Get the status of a call"""
+        call = self.get_call(call_connection_id)
+        return call.status if call else 'idle'
+
+
+    def is_call_active(self, call_connection_id: str) -> bool:
+        """Check if a call is active"""
+        return self.get_call_status(call_connection_id) == 'active'
+
+
+    def active_call_count(self) -> int:
+        """Get the number of calls in flight"""
+        with self._lock:
+            return sum(1 for call in self.calls.values() if call.status == 'active')
+
+
+    def _store_response(self, call_connection_id: str, response: Optional[str], status: str = 'completed'):
+        """Store the response for a call and wake up everyone waiting for it"""
+        with self._lock:
+            call = self.calls.get(call_connection_id)
+            if call is None:
+                return
+            call.response = response
+            call.status = status
+            call.ended_at = time.monotonic()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._resolve_waiter, future)
+
+
+    @staticmethod
+    def _resolve_waiter(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+
+    def _evict_expired(self):
+        """Remove ended calls after the retention period and give up on calls that never ended"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                call.call_connection_id for call in self.calls.values()
+                if call.status != 'active' and now - call.ended_at > self.retention_seconds
+            ]
+            for call_connection_id in stale:
+                del self.calls[call_connection_id]
+            expired = [
+                call.call_connection_id for call in self.calls.values()
+                if call.status == 'active' and now - call.started_at > self.max_call_seconds
+            ]
+        for call_connection_id in expired:
+            self._store_response(call_connection_id, None, 'failed')
+
+
+    async def wait_for_call(self, call_connection_id: str, timeout: float) -> tuple[Optional[str], str]:
+        """Wait until a call is no longer active or the timeout expires.
+
+        Returns the response and status of the call. Does not block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            call = self.calls.get(call_connection_id)
+            if call is None:
+                return None, 'idle'
+            if call.status != 'active':
+                return call.response, call.status
+            call.waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if (loop, future) in call.waiters:
+                    call.waiters.remove((loop, future))
+        return call.response, call.status
+
+
+    def recognize_speech(self, call_connection_client: CallConnectionClient,
                           text_to_play: str, target_participant: str):
+        from azure.communication.callautomation import RecognizeInputType, TextSource
+
         play_source = TextSource(text=text_to_play, voice_name=SPEECH_TO_TEXT_VOICE)
         call_connection_client.start_recognizing_media(
             input_type=RecognizeInputType.SPEECH,
@@ -100,95 +243,206 @@ class CallServer:
 
 
     def handle_play(self, call_connection_client: CallConnectionClient, text_to_play: str):
+        from azure.communication.callautomation import TextSource
+
         play_source = TextSource(text=text_to_play, voice_name=SPEECH_TO_TEXT_VOICE)
         call_connection_client.play_media_to_all(play_source)
 
 
-    def make_call(self, start_message: str, end_message: str):
-        """Make an outbound call with specified messages"""
-        if self.is_call_active():
-            return {"error": "A call is already active. Only one call at a time is supported."}
-        
-        # Set the messages for this call
-        self.start_message = start_message
-        self.end_message = end_message
+    def make_call(self, start_message: str, end_message: str, target_phone_number: Optional[str] = None):
+        """Make an outbound call with specified messages. Several calls can be in flight at once.
+
+        If the call cannot be created, the result contains an error instead of a call connection id.
+        """
+        from azure.communication.callautomation import PhoneNumberIdentifier
+        from azure.core.exceptions import AzureError
 
-        target_participant = PhoneNumberIdentifier(TARGET_PHONE_NUMBER)
+        self._evict_expired()
+        target_phone_number = target_phone_number or TARGET_PHONE_NUMBER
+
+        target_participant = PhoneNumberIdentifier(target_phone_number)
         source_caller = PhoneNumberIdentifier(ACS_PHONE_NUMBER)
-        call_connection_properties = self.call_automation_client.create_call(
-            target_participant=target_participant,
-            callback_url=CALLBACK_EVENTS_URI,
-            cognitive_services_endpoint=self.ai_endpoint,
-            source_caller_id_number=source_caller
-        )
-        
+        try:
+            call_connection_properties = self.call_automation_client.create_call(
+                target_participant=target_participant,
+                callback_url=CALLBACK_EVENTS_URI,
+                cognitive_services_endpoint=self.ai_endpoint,
+                source_caller_id_number=source_caller
+            )
+        except AzureError as e:
+            logger.warning("Failed to create call to %s: %s", target_phone_number, e)
+            return {"error": f"Failed to initiate call: {e}"}
+
         call_connection_id = call_connection_properties.call_connection_id
-        self.app.logger.debug("Created call with connection id: %s", call_connection_id)
-        
+        logger.debug("Created call with connection id: %s", call_connection_id)
+
         # Initialize call state
-        self.current_call_id = call_connection_id
-        self.call_status = 'active'
-        self.call_response = None
-        
+        with self._lock:
+            self.calls[call_connection_id] = CallState(
+                call_connection_id=call_connection_id,
+                start_message=start_message,
+                end_message=end_message,
+                target_phone_number=target_phone_number,
+                target_participant=target_participant,
+            )
+
         return {
             "message": "Call setup successfully",
             "call_connection_id": call_connection_id,
-            "start_message": self.start_message,
-            "end_message": self.end_message
+            "start_message": start_message,
+            "end_message": end_message
         }
 
 
+    def _accept_event(self, call: CallState, event: CloudEvent) -> bool:
+        """Check whether an event is new and in order for its call, and mark it as seen"""
+        stage = EVENT_STAGES.get(event.type, 0)
+        with self._lock:
+            if event.id in call.seen_event_ids or stage < call.stage:
+                return False
+            call.seen_event_ids.add(event.id)
+            call.stage = max(call.stage, stage)
+            return True
+
+
+    def _get_call_connection(self, call: CallState) -> CallConnectionClient:
+        """Get the cached connection client of a call"""
+        if call.connection is None:
+            call.connection = self.call_automation_client.get_call_connection(call.call_connection_id)
+        return call.connection
+
+
+    def handle_event(self, event: CloudEvent):
+        """Process a single callback event"""
+        call_connection_id = event.data['callConnectionId']
+        logger.debug("%s event received for call connection id: %s",
+                           event.type, call_connection_id)
+
+        call = self.get_call(call_connection_id)
+        if call is None:
+            logger.debug("Ignoring event for unknown call connection id: %s", call_connection_id)
+            return
+        if not self._accept_event(call, event):
+            logger.debug("Ignoring duplicate or out-of-order %s event", event.type)
+            return
+
+        call_connection_client = self._get_call_connection(call)
+
+        if event.type == "Microsoft.Communication.CallConnected":
+            logger.debug("Starting recognize with message: %s", call.start_message)
+            self.recognize_speech(
+                call_connection_client=call_connection_client,
+                text_to_play=call.start_message,
+                target_participant=call.target_participant
+            )
+
+        elif event.type == "Microsoft.Communication.RecognizeCompleted":
+            logger.debug("Recognize completed: data=%s", event.data)
+
+            if event.data['recognitionType'] == "speech":
+                text = event.data['speechResult']['speech']
+                logger.debug("Recognition completed, text=%s", text)
+
+                # Store the recognized speech as the response
+                self._store_response(call_connection_id, text, 'completed')
+
+                self.handle_play(call_connection_client=call_connection_client,
+                               text_to_play=call.end_message)
+
+        elif event.type == "Microsoft.Communication.RecognizeFailed":
+            logger.debug("Recognition failed, terminating call")
+
+            # Store failure message
+            self._store_response(call_connection_id, "Recognition failed - no response received", 'failed')
+
+            self.handle_play(call_connection_client=call_connection_client,
+                           text_to_play="I'm sorry, I didn't understand. Goodbye.")
+
+        elif event.type in ["Microsoft.Communication.PlayCompleted", "Microsoft.Communication.PlayFailed"]:
+            logger.debug("Terminating call")
+            call_connection_client.hang_up(is_for_everyone=True)
+
+        elif event.type == "Microsoft.Communication.CallDisconnected":
+            logger.debug("Call disconnected")
+
+            # The call ended before a response was recognized
+            if call.status == 'active':
+                self._store_response(call_connection_id, None, 'idle')
+
+
     def callback_events_handler(self):
+        from azure.core.messaging import CloudEvent
+        from flask import Response, request
+
         for event_dict in request.json:
             # Parsing callback events
-            event = CloudEvent.from_dict(event_dict)
-            call_connection_id = event.data['callConnectionId']
-            self.app.logger.debug("%s event received for call connection id: %s", 
-                               event.type, call_connection_id)
-            
-            call_connection_client = self.call_automation_client.get_call_connection(call_connection_id)
-            target_participant = PhoneNumberIdentifier(TARGET_PHONE_NUMBER)
-            
-            if event.type == "Microsoft.Communication.CallConnected":
-                self.app.logger.debug("Starting recognize with message: %s", self.start_message)
-                self.recognize_speech(
-                    call_connection_client=call_connection_client,
-                    text_to_play=self.start_message,
-                    target_participant=target_participant
-                )
-
-            elif event.type == "Microsoft.Communication.RecognizeCompleted":
-                self.app.logger.debug("Recognize completed: data=%s", event.data)
-
-                if event.data['recognitionType'] == "speech":
-                    text = event.data['speechResult']['speech']
-                    self.app.logger.debug("Recognition completed, text=%s", text)
-                    
-                    # Store the recognized speech as the response
-                    self._store_response(text, 'completed')
-                    
-                    self.handle_play(call_connection_client=call_connection_client, 
-                                   text_to_play=self.end_message)
-
-            elif event.type == "Microsoft.Communication.RecognizeFailed":
-                self.app.logger.debug("Recognition failed, terminating call")
-                
-                # Store failure message
-                self._store_response("Recognition failed - no response received", 'failed')
-                
-                self.handle_play(call_connection_client=call_connection_client, 
-                               text_to_play="I'm sorry, I didn't understand. Goodbye.")
-
-            elif event.type in ["Microsoft.Communication.PlayCompleted", "Microsoft.Communication.PlayFailed"]:
-                self.app.logger.debug("Terminating call")
-                call_connection_client.hang_up(is_for_everyone=True)
+            self.handle_event(CloudEvent.from_dict(event_dict))
 
+        self._evict_expired()
         return Response(status=200)
 
 
-    def run(self, port=8080):
-        """Run the Flask application"""
-        self.app.run(port=port)
+    async def _async_callback_events_handler(self, http_request: web.Request) -> web.Response:
+        """Acknowledge callbacks immediately and hand the events to the workers"""
+        from aiohttp import web
+        from azure.core.messaging import CloudEvent
+
+        for event_dict in await http_request.json():
+            event = CloudEvent.from_dict(event_dict)
+            # Events of the same call always go to the same worker, so they are processed in order
+            worker = hash(event.data['callConnectionId']) % len(self._event_queues)
+            self._event_queues[worker].put_nowait(event)
+        return web.Response(status=200)
+
+
+    async def _event_worker(self, queue: asyncio.Queue):
+        while True:
+            event = await queue.get()
+            try:
+                # The ACS client is blocking, so it runs outside of the event loop
+                await asyncio.to_thread(self.handle_event, event)
+            except Exception:
+                logger.exception("Failed to process %s event", event.type)
+            finally:
+                queue.task_done()
+            self._evict_expired()
+
+
+    async def run_async(self, port=8080, workers=CALL_SERVER_WORKERS):
+        """Run the callback server on aiohttp with a pool of event workers"""
+        from aiohttp import web
+
+        self._event_queues = [asyncio.Queue() for _ in range(workers)]
+        worker_tasks = [asyncio.create_task(self._event_worker(queue)) for queue in self._event_queues]
+
+        app = web.Application()
+        app.router.add_post('/api/callbacks', self._async_callback_events_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, port=port).start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for task in worker_tasks:
+                task.cancel()
+            await runner.cleanup()
+
+
+    def run(self, port=8080, mode=CALL_SERVER_MODE):
+        """Run the callback server in the given mode"""
+        if mode == "async":
+            asyncio.run(self.run_async(port=port))
+        else:
+            self.app.run(port=port)
+
+
+    def start(self, port=8080, mode=CALL_SERVER_MODE) -> threading.Thread:
+        """Run the callback server in a background thread, unless it is running already"""
+        with self._lock:
+            if self._server_thread is None:
+                self._server_thread = threading.Thread(target=self.run, kwargs={'port': port, 'mode': mode}, daemon=True)
+                self._server_thread.start()
+            return self._server_thread
 
 
 if __name__ == '__main__':
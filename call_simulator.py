@@ -0,0 +1,274 @@
+"""Local stand-in for the ACS call automation client and a load test for the call path.
+
+The simulator answers the calls of the CallServer by posting the CloudEvent sequences ACS would send
+to /api/callbacks, so that CallServer and CallPlugin can be exercised without an ACS resource, a phone
+or a dev tunnel:
+
+    python call_simulator.py --calls 200 --concurrency 50 --mode async
+"""
+from dataclasses import dataclass
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+import uuid
+
+import aiohttp
+from azure.core.exceptions import HttpResponseError
+
+# The simulator does not talk to Azure, but the call server needs these to be set
+os.environ.setdefault("COGNITIVE_SERVICES_ENDPOINT", "https://simulator.local/")
+os.environ.setdefault("ACS_PHONE_NUMBER", "+10000000000")
+os.environ.setdefault("TARGET_PHONE_NUMBER", "+10000000001")
+
+from call_server import CallServer
+from plugins.call_plugin import CallPlugin
+
+
+EVENT_PREFIX = "Microsoft.Communication."
+CREATE_FAILURE_MESSAGE = "Simulated failure to create the call"
+
+
+@dataclass
+class SimulatedCall:
+    """A call answered by the simulator and the outcome it is scripted to have."""
+
+    call_connection_id: str
+    scenario: str  # 'answered', 'recognize_failed', 'hung_up'
+    speech: str
+
+
+class SimulatedCallConnectionProperties:
+    def __init__(self, call_connection_id: str):
+        self.call_connection_id = call_connection_id
+
+
+class SimulatedCallConnection:
+    """Stand-in for CallConnectionClient that answers each action with the callback events ACS would send."""
+
+    def __init__(self, simulator: "CallSimulator", call: SimulatedCall):
+        self.simulator = simulator
+        self.call = call
+
+    def start_recognizing_media(self, **kwargs):
+        if self.call.scenario == "recognize_failed":
+            self.simulator.send(self.call, "RecognizeFailed")
+        else:
+            self.simulator.send(self.call, "RecognizeCompleted", recognitionType="speech", speechResult={"speech": self.call.speech})
+
+    def play_media_to_all(self, play_source, **kwargs):
+        self.simulator.send(self.call, "PlayCompleted")
+
+    def hang_up(self, is_for_everyone: bool = False, **kwargs):
+        self.simulator.send(self.call, "CallDisconnected")
+
+
+class CallSimulator:
+    """Stand-in for CallAutomationClient that posts the callback events of its calls to a callback URL.
+
+    Every event is delivered after a random latency around the configured one. Calls fail to be created,
+    fail speech recognition or are hung up by the callee with the configured rates, and events are
+    delivered a second time with the duplicate rate, which also makes them arrive out of order.
+    """
+
+    def __init__(self, callback_url: str, latency: float = 0.05, create_failure_rate: float = 0.0,
+                 recognize_failure_rate: float = 0.0, hang_up_rate: float = 0.0, duplicate_rate: float = 0.0,
+                 seed: int = None):
+        self.callback_url = callback_url
+        self.latency = latency
+        self.create_failure_rate = create_failure_rate
+        self.recognize_failure_rate = recognize_failure_rate
+        self.hang_up_rate = hang_up_rate
+        self.duplicate_rate = duplicate_rate
+        self.random = random.Random(seed)
+        self.calls: dict[str, SimulatedCall] = {}
+        # Time until each callback was acknowledged by the server
+        self.callback_latencies: list[float] = []
+        self.failed_callbacks = 0
+        self.failed_creates = 0
+
+        # Callbacks are posted from an event loop in a background thread, like ACS posts them from outside
+        self._loop = asyncio.new_event_loop()
+        self._session: aiohttp.ClientSession = None
+        self._pending: set = set()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open_session(), self._loop).result()
+
+    async def _open_session(self):
+        # Every callback uses a new connection, like the webhooks of ACS
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True))
+
+    async def _close_session(self):
+        # Late duplicates may still be on their way
+        while self._pending:
+            await asyncio.gather(*self._pending)
+        await self._session.close()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._close_session(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _delay(self) -> float:
+        return self.random.uniform(0.5, 1.5) * self.latency
+
+    def create_call(self, target_participant=None, callback_url=None, **kwargs) -> SimulatedCallConnectionProperties:
+        if self.random.random() < self.create_failure_rate:
+            self.failed_creates += 1
+            raise HttpResponseError(message=CREATE_FAILURE_MESSAGE)
+
+        roll = self.random.random()
+        if roll < self.recognize_failure_rate:
+            scenario = "recognize_failed"
+        elif roll < self.recognize_failure_rate + self.hang_up_rate:
+            scenario = "hung_up"
+        else:
+            scenario = "answered"
+        call_connection_id = str(uuid.uuid4())
+        call = SimulatedCall(call_connection_id, scenario, speech=f"Simulated answer for {call_connection_id[:8]}")
+        self.calls[call_connection_id] = call
+
+        self.send(call, "CallDisconnected" if scenario == "hung_up" else "CallConnected")
+        return SimulatedCallConnectionProperties(call_connection_id)
+
+    def get_call_connection(self, call_connection_id: str) -> SimulatedCallConnection:
+        return SimulatedCallConnection(self, self.calls[call_connection_id])
+
+    def send(self, call: SimulatedCall, event_type: str, **data):
+        """Post a callback event after the simulated latency, possibly twice."""
+        event = {
+            "id": str(uuid.uuid4()),
+            "source": f"calling/callConnections/{call.call_connection_id}",
+            "type": EVENT_PREFIX + event_type,
+            "specversion": "1.0",
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "data": {"callConnectionId": call.call_connection_id, **data},
+        }
+        self._loop.call_soon_threadsafe(self._schedule, event, self._delay())
+        if self.random.random() < self.duplicate_rate:
+            self._loop.call_soon_threadsafe(self._schedule, event, self._delay() * 2)
+
+    def _schedule(self, event: dict, delay: float):
+        task = self._loop.create_task(self._post(event, delay))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _post(self, event: dict, delay: float):
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        try:
+            async with self._session.post(self.callback_url, json=[event]) as response:
+                response.raise_for_status()
+            self.callback_latencies.append(time.perf_counter() - started)
+        except Exception:
+            self.failed_callbacks += 1
+
+
+def _expected_result(call: SimulatedCall | None) -> str:
+    # Calls that failed to be created are reported to the agent by the plugin
+    if call is None:
+        return f"Failed to initiate call: {CREATE_FAILURE_MESSAGE}"
+    if call.scenario == "answered":
+        return f"Response received: {call.speech}"
+    if call.scenario == "recognize_failed":
+        return "Call failed. No response received."
+    return "Call ended without a response."
+
+
+def _wait_for_port(port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise TimeoutError(f"The call server did not start on port {port}")
+
+
+def _format_latencies(latencies: list[float]) -> str:
+    if not latencies:
+        return "n/a"
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return f"p50 {statistics.median(latencies) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms"
+
+
+async def run_load_test(args) -> bool:
+    """Run the calls through CallPlugin and the call server, print the metrics and return whether all outcomes were as scripted."""
+    simulator = CallSimulator(
+        callback_url=f"http://127.0.0.1:{args.port}/api/callbacks",
+        latency=args.latency,
+        create_failure_rate=args.create_failure_rate,
+        recognize_failure_rate=args.recognize_failure_rate,
+        hang_up_rate=args.hang_up_rate,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+    )
+    call_server = CallServer(call_automation_client=simulator)
+    call_server.start(port=args.port, mode=args.mode)
+    _wait_for_port(args.port)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    wait_times: list[float] = []
+    outcomes = {"as scripted": 0, "unexpected": 0, "errors": 0}
+
+    async def place_call(index: int):
+        async with semaphore:
+            plugin = CallPlugin(call_server=call_server, timeout_seconds=args.timeout)
+            started = time.perf_counter()
+            try:
+                result = await plugin.make_call_and_wait(f"Simulated question {index}")
+            except Exception:
+                outcomes["errors"] += 1
+                return
+            call = simulator.calls.get(plugin.call_connection_id)
+            if call:
+                wait_times.append(time.perf_counter() - started)
+            outcomes["as scripted" if result == _expected_result(call) else "unexpected"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(place_call(index) for index in range(args.calls)))
+    elapsed = time.perf_counter() - started
+    simulator.close()
+
+    scenarios = {"create_failed": simulator.failed_creates} if simulator.failed_creates else {}
+    for call in simulator.calls.values():
+        scenarios[call.scenario] = scenarios.get(call.scenario, 0) + 1
+
+    print("**Call Simulator**:")
+    print(f"-- {args.calls} calls in {elapsed:.2f}s ({args.calls / elapsed:.1f} calls/s, concurrency {args.concurrency}, {args.mode} server)")
+    print(f"-- Scenarios: {', '.join(f'{name} {count}' for name, count in sorted(scenarios.items()))}")
+    print(f"-- Outcomes: {', '.join(f'{name} {count}' for name, count in outcomes.items())}")
+    print(f"-- Callbacks: {len(simulator.callback_latencies)} acknowledged ({_format_latencies(simulator.callback_latencies)}), {simulator.failed_callbacks} failed")
+    print(f"-- End-to-end wait: {_format_latencies(wait_times)}")
+
+    return outcomes["unexpected"] == 0 and outcomes["errors"] == 0 and simulator.failed_callbacks == 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the call server and plugin against a local ACS simulator.")
+    parser.add_argument("--calls", type=int, default=100, help="Number of calls to place")
+    parser.add_argument("--concurrency", type=int, default=20, help="Number of calls in flight at once")
+    parser.add_argument("--mode", choices=["flask", "async"], default="flask", help="Call server mode")
+    parser.add_argument("--port", type=int, default=8090, help="Port of the call server")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean latency of each callback event in seconds")
+    parser.add_argument("--create-failure-rate", type=float, default=0.0, help="Rate of calls that fail to be created")
+    parser.add_argument("--recognize-failure-rate", type=float, default=0.0, help="Rate of calls whose speech recognition fails")
+    parser.add_argument("--hang-up-rate", type=float, default=0.0, help="Rate of calls the callee hangs up without answering")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Rate of callback events that are delivered twice, the second time late")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout of each call in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # The development server logs every callback request
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    success = asyncio.run(run_load_test(parse_args()))
+    raise SystemExit(0 if success else 1)
@@ -0,0 +1,69 @@
+import os
+
+from semantic_kernel.contents import ChatMessageContent
+
+from artifact_store import PATCH_LANGUAGES, extract_code_blocks, is_full_document
+from plugins.file_plugin import FileContent, FilePlugin
+
+
+# Marks the report of files saved directly from a Developer message
+SAVED_FILES_MARKER = "[Files saved to the session directory:"
+
+
+class CodeWriter:
+    """Saves the code blocks of Developer messages directly to the session directory.
+
+    Code blocks are written as files, diff blocks are applied as patches to the existing files.
+    Files are only written if every code block states a distinct file name. A block whose file name is only
+    assumed from its language may be a snippet of a file, so it is only written if it is a full HTML document.
+    Otherwise the message is left unchanged and the FileManager agent takes care of saving the files.
+    """
+
+    def __init__(self, file_plugin: FilePlugin, agent_name: str = "Developer"):
+        self.file_plugin = file_plugin
+        self.agent_name = agent_name
+
+    def _files(self, text: str) -> tuple[dict[str, str], list[str]] | None:
+        """Return the files and the patches of a message, or None if it has no code or is ambiguous."""
+        blocks = extract_code_blocks(text)
+        if not blocks:
+            return None
+
+        # Patches carry their own file names in the diff headers
+        patches = [block.content for block in blocks if block.language in PATCH_LANGUAGES]
+        blocks = [block for block in blocks if block.language not in PATCH_LANGUAGES]
+
+        # Writing a snippet such as a single CSS rule as styles.css would replace the whole file
+        if any(block.named_by_language and not is_full_document(block.content) for block in blocks):
+            return None
+
+        names = [block.name for block in blocks]
+        if None in names or len(set(names)) != len(names):
+            return None
+        if any(os.path.isabs(name) or ".." in name.split("/") for name in names):
+            return None
+        return {block.name: block.content for block in blocks}, patches
+
+    async def process(self, message: ChatMessageContent) -> ChatMessageContent:
+        """Response processor that saves the code of a Developer message and reports the result in the message."""
+        if message.name != self.agent_name:
+            return message
+
+        content = message.content or ""
+        code = self._files(content)
+        if not code:
+            return message
+
+        files, patches = code
+        results = []
+        if files:
+            results.append(self.file_plugin.create_files([FileContent(path=path, content=file_content) for path, file_content in files.items()]))
+        for patch in patches:
+            results.append(self.file_plugin.apply_patch(patch))
+        report = "\n".join([SAVED_FILES_MARKER, *results]) + "]"
+        return ChatMessageContent(
+            role=message.role,
+            name=message.name,
+            content=f"{content}\n\n{report}",
+            metadata=message.metadata,
+        )
@@ -0,0 +1,48 @@
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from manager_context import digest
+
+
+# The agents whose messages each role receives in full. Roles that are not listed receive all messages.
+# The CallOperator gets the verdicts of the QA agent; its calls and the feedback of the expert are part of its own thread.
+DEFAULT_CONTEXT_SOURCES: dict[str, list[str]] = {
+    "FileManager": ["Developer"],
+    "CallOperator": ["QualityAssurance"],
+}
+
+
+class ContextFilter:
+    """Decides which messages of the group chat an agent receives in full.
+
+    The group chat shares every response with every agent. Messages of agents that are not a source of the role
+    are replaced with a compact placeholder, a digest of a few tokens in which code blocks are reduced to one-line
+    descriptions, so that the agent still sees who did what. Messages of the user, such as the task, are always
+    received in full, and so are its own messages, which only reach it when a session is resumed.
+    """
+
+    def __init__(self, role: str, sources: list[str], placeholder_tokens: int = 40):
+        self.role = role
+        self.sources = set(sources)
+        self.placeholder_tokens = placeholder_tokens
+
+    def apply(self, message: ChatMessageContent) -> ChatMessageContent:
+        """Return the message, or a placeholder if the role does not need it."""
+        content = message.content or ""
+        if message.role == AuthorRole.USER or message.name == self.role or message.name in self.sources:
+            return message
+
+        placeholder = f"[Shortened for the {self.role}: {digest(content, self.placeholder_tokens)}]"
+        if len(placeholder) >= len(content):
+            return message
+        return ChatMessageContent(
+            role=message.role,
+            name=message.name,
+            content=placeholder,
+            metadata=message.metadata,
+        )
+
+
+def create_context_filters(sources: dict[str, list[str]] | None = None) -> dict[str, ContextFilter]:
+    """Create the context filters of the roles, by agent name."""
+    sources = DEFAULT_CONTEXT_SOURCES if sources is None else sources
+    return {role: ContextFilter(role, role_sources) for role, role_sources in sources.items()}
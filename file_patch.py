@@ -0,0 +1,148 @@
+from dataclasses import dataclass, field
+import re
+
+
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchConflictError(Exception):
+    """Raised when a patch or edit does not match the current content of a file."""
+
+
+@dataclass
+class Hunk:
+    """A hunk of a unified diff."""
+
+    old_start: int
+    # Numbers of old and new lines announced by the hunk header
+    old_count: int = 1
+    new_count: int = 1
+    old_lines: list[str] = field(default_factory=list)
+    new_lines: list[str] = field(default_factory=list)
+
+    @property
+    def is_complete(self) -> bool:
+        return len(self.old_lines) >= self.old_count and len(self.new_lines) >= self.new_count
+
+    @property
+    def expected_index(self) -> int:
+        """The index of the first old line, or for a pure insertion the index the new lines are inserted at."""
+        # An insertion @@ -N,0 @@ goes after line N, a hunk with old lines starts at line N
+        return self.old_start if not self.old_lines else self.old_start - 1
+
+    def check_counts(self):
+        if len(self.old_lines) != self.old_count or len(self.new_lines) != self.new_count:
+            raise PatchConflictError(
+                f"Hunk at line {self.old_start} has {len(self.old_lines)} old and {len(self.new_lines)} new lines, "
+                f"but its header announces {self.old_count} and {self.new_count}. The patch may be truncated."
+            )
+
+
+@dataclass
+class FilePatch:
+    """The hunks of a unified diff for a single file."""
+
+    path: str
+    hunks: list[Hunk] = field(default_factory=list)
+    is_new_file: bool = False
+
+
+def _strip_path(header: str) -> str:
+    path = header.split("\t")[0].strip()
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+def parse_unified_diff(patch: str) -> list[FilePatch]:
+    """Parse a unified diff that may span several files.
+
+    The lines of each hunk are checked against the counts of its header, so that a truncated or mis-counted
+    patch is rejected instead of being applied partially.
+    """
+    file_patches: list[FilePatch] = []
+    current: FilePatch | None = None
+    hunk: Hunk | None = None
+    old_path = None
+
+    for line in patch.splitlines():
+        if line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        if hunk is not None and not hunk.is_complete:
+            # Inside a hunk, lines such as "--- x" are removed lines, not file headers
+            marker, text = (line[0], line[1:]) if line else (" ", "")
+            if marker not in (" ", "-", "+"):
+                hunk.check_counts()
+            if marker in (" ", "-"):
+                hunk.old_lines.append(text)
+            if marker in (" ", "+"):
+                hunk.new_lines.append(text)
+            if len(hunk.old_lines) > hunk.old_count or len(hunk.new_lines) > hunk.new_count:
+                hunk.check_counts()
+        elif line.startswith("--- "):
+            old_path = _strip_path(line[4:])
+            hunk = None
+        elif line.startswith("+++ "):
+            new_path = _strip_path(line[4:])
+            current = FilePatch(path=new_path, is_new_file=old_path == "/dev/null")
+            file_patches.append(current)
+            hunk = None
+        elif line.startswith("@@"):
+            match = HUNK_HEADER_PATTERN.match(line)
+            if current is None or match is None:
+                raise PatchConflictError(f"Invalid hunk header: {line}")
+            hunk = Hunk(
+                old_start=int(match.group(1)),
+                old_count=int(match.group(2)) if match.group(2) is not None else 1,
+                new_count=int(match.group(4)) if match.group(4) is not None else 1,
+            )
+            current.hunks.append(hunk)
+        elif hunk is not None and (line.startswith(("-", "+")) or line.startswith(" ") and line.strip()):
+            # A complete hunk followed by more hunk lines is mis-counted
+            raise PatchConflictError(f"Hunk at line {hunk.old_start} has more lines than its header announces.")
+
+    if hunk is not None:
+        hunk.check_counts()
+    if not file_patches:
+        raise PatchConflictError("The patch does not contain any file headers (--- / +++).")
+    return file_patches
+
+
+def _find_hunk(lines: list[str], hunk: Hunk, expected: int) -> int:
+    """Find the position of the old lines of a hunk, preferring the position closest to the expected one."""
+    size = len(hunk.old_lines)
+    if size == 0:
+        return min(max(expected, 0), len(lines))
+
+    for normalize in (lambda line: line, lambda line: line.rstrip()):
+        old_lines = [normalize(line) for line in hunk.old_lines]
+        positions = [
+            position for position in range(len(lines) - size + 1)
+            if [normalize(line) for line in lines[position:position + size]] == old_lines
+        ]
+        if positions:
+            return min(positions, key=lambda position: abs(position - expected))
+
+    preview = "\n".join(hunk.old_lines[:3])
+    raise PatchConflictError(f"Hunk at line {hunk.old_start} does not match the file. Expected lines:\n{preview}")
+
+
+def apply_file_patch(text: str, file_patch: FilePatch) -> str:
+    """Apply the hunks of a file patch to the text of the file."""
+    lines = text.splitlines()
+    trailing_newline = text.endswith("\n") or not text
+    offset = 0
+    for hunk in file_patch.hunks:
+        position = _find_hunk(lines, hunk, hunk.expected_index + offset)
+        lines[position:position + len(hunk.old_lines)] = hunk.new_lines
+        offset = position - hunk.expected_index + len(hunk.new_lines) - len(hunk.old_lines)
+    return "\n".join(lines) + ("\n" if trailing_newline and lines else "")
+
+
+def apply_search_replace(text: str, search: str, replace: str) -> str:
+    """Replace the single occurrence of search in text."""
+    count = text.count(search) if search else 0
+    if count != 1:
+        preview = search[:80].replace("\n", "\\n")
+        raise PatchConflictError(f"The search text was found {count} times, expected exactly once: '{preview}'")
+    return text.replace(search, replace, 1)
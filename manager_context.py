@@ -0,0 +1,118 @@
+import re
+
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+
+from artifact_store import CODE_BLOCK_PATTERN
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens of a text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def digest(text: str, max_tokens: int) -> str:
+    """Shorten a message to a digest of at most max_tokens.
+
+    Code blocks are replaced by a one-line description, and remaining long text keeps its beginning and end.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    def describe_code_block(match: re.Match) -> str:
+        language = match.group(1).strip() or "code"
+        code = match.group(2)
+        return f"[{language} block: {code.count(chr(10)) + 1} lines, {len(code)} characters]"
+
+    text = CODE_BLOCK_PATTERN.sub(describe_code_block, text)
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+
+    head = text[:max_chars * 3 // 4]
+    tail = text[-(max_chars // 4):]
+    return f"{head} [... {len(text) - len(head) - len(tail)} characters truncated ...] {tail}"
+
+
+class ManagerContextBuilder:
+    """Builds a bounded view of the group chat history for the chat manager.
+
+    The first message (the task) and the last messages are kept, with large code blocks and tool output
+    reduced to digests. Older messages are folded into a summary that is extended incrementally as messages
+    move out of the verbatim window. The summary is shortened from the oldest end to stay within the budget.
+    """
+
+    def __init__(
+        self,
+        keep_last: int = 8,
+        token_budget: int = 8000,
+        max_message_tokens: int = 1000,
+        summary_line_tokens: int = 60,
+    ):
+        self.keep_last = keep_last
+        self.token_budget = token_budget
+        self.max_message_tokens = max_message_tokens
+        self.summary_line_tokens = summary_line_tokens
+        self._summary_lines: list[str] = []
+        self._summarized_count = 0
+
+    def build(self, chat_history: ChatHistory) -> ChatHistory:
+        """Return a new chat history that fits into the token budget."""
+        messages = chat_history.messages
+        if not messages:
+            return ChatHistory()
+
+        task, rest = messages[0], messages[1:]
+        split = max(len(rest) - self.keep_last, 0)
+        older, recent = rest[:split], rest[split:]
+
+        # The manager history only ever grows. If it did not, this is a different conversation.
+        if split < self._summarized_count:
+            self._summary_lines = []
+            self._summarized_count = 0
+        for message in older[self._summarized_count:]:
+            if self._is_transfer_message(message):
+                continue
+            author = message.name or message.role.value
+            self._summary_lines.append(f"- {author}: {digest(message.content or '', self.summary_line_tokens)}")
+        self._summarized_count = split
+
+        bounded = ChatHistory()
+        bounded.add_message(self._shortened(task))
+        recent_messages = [self._shortened(message) for message in recent]
+        used_tokens = sum(estimate_tokens(message.content or "") for message in [bounded.messages[0], *recent_messages])
+
+        summary = self._summary(self.token_budget - used_tokens)
+        if summary:
+            bounded.add_message(ChatMessageContent(role=AuthorRole.USER, content=summary))
+        for message in recent_messages:
+            bounded.add_message(message)
+        return bounded
+
+    def _summary(self, available_tokens: int) -> str | None:
+        if not self._summary_lines:
+            return None
+
+        header = "Summary of the earlier discussion:"
+        lines = []
+        used_tokens = estimate_tokens(header)
+        for line in reversed(self._summary_lines):
+            used_tokens += estimate_tokens(line) + 1
+            if used_tokens > available_tokens:
+                break
+            lines.insert(0, line)
+
+        omitted = len(self._summary_lines) - len(lines)
+        if omitted:
+            lines.insert(0, f"- ({omitted} earlier messages omitted)")
+        return "\n".join([header, *lines])
+
+    def _shortened(self, message: ChatMessageContent) -> ChatMessageContent:
+        content = message.content or ""
+        shortened = digest(content, self.max_message_tokens)
+        if shortened == content:
+            return message
+        return ChatMessageContent(role=message.role, name=message.name, content=shortened)
+
+    @staticmethod
+    def _is_transfer_message(message: ChatMessageContent) -> bool:
+        return message.role == AuthorRole.USER and (message.content or "").startswith("Transferred to ")
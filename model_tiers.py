@@ -0,0 +1,129 @@
+import os
+
+
+# Roles that use the small tier by default. ChatManager stands for the termination and selection decisions
+# of the chat manager, its summary always uses the large tier.
+DEFAULT_SMALL_MODEL_ROLES = ["FileManager", "CallOperator", "ChatManager"]
+
+# List prices in USD per million input and output tokens, by model name. Deployments with other names can be
+# priced with MODEL_PRICES, e.g. MODEL_PRICES="my-large=2.00/8.00,my-small=0.40/1.60".
+DEFAULT_MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+def parse_prices(value: str) -> dict[str, tuple[float, float]]:
+    """Parse prices given as name=input/output pairs separated by commas."""
+    prices = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, price = item.partition("=")
+        input_price, _, output_price = price.partition("/")
+        prices[name.strip()] = (float(input_price), float(output_price))
+    return prices
+
+
+class ModelTiers:
+    """The model deployments of the large and the small tier and the roles that use the small tier.
+
+    Roles that only route or copy content, such as the FileManager, the CallOperator and the decisions of the
+    chat manager, do not need the large model but pay its latency. Without a small deployment, all roles use
+    the large one.
+    """
+
+    def __init__(self, large: str, small: str | None = None, small_roles: list[str] | None = None,
+                 prices: dict[str, tuple[float, float]] | None = None):
+        self.large = large
+        self.small = small or large
+        self.small_roles = DEFAULT_SMALL_MODEL_ROLES if small_roles is None else small_roles
+        self.prices = {**DEFAULT_MODEL_PRICES, **(prices or {})}
+
+    @classmethod
+    def from_env(cls, small_roles: list[str] | None = None) -> "ModelTiers":
+        """Get the tiers from AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME and AZURE_AI_AGENT_SMALL_MODEL_DEPLOYMENT_NAME."""
+        from semantic_kernel.agents import AzureAIAgentSettings
+
+        return cls(
+            large=AzureAIAgentSettings().model_deployment_name,
+            small=os.getenv("AZURE_AI_AGENT_SMALL_MODEL_DEPLOYMENT_NAME"),
+            small_roles=small_roles,
+            prices=parse_prices(os.getenv("MODEL_PRICES", "")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.small != self.large and bool(self.small_roles)
+
+    def deployment(self, role: str) -> str:
+        """Get the deployment that the given role uses."""
+        return self.small if role in self.small_roles else self.large
+
+    def tier(self, deployment: str | None) -> str:
+        if deployment == self.large:
+            return "large"
+        return "small" if deployment == self.small else "other"
+
+    def cost(self, deployment: str | None, prompt_tokens: int, completion_tokens: int) -> float | None:
+        """Get the cost of the tokens in USD, if the price of the deployment is known."""
+        price = self.prices.get(deployment)
+        if price is None:
+            return None
+        return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+    def comparison(self, records: list[dict]) -> list[list[str]]:
+        """Compare the latency, tokens and cost of the agent responses and manager decisions per role and tier as table rows."""
+        rows = [["", "model", "count", "avg", "avg TTFT", "prompt tok", "completion tok", "cost"]]
+        groups: dict[tuple[str, str], list[dict]] = {}
+        for record in records:
+            if record["type"] not in ("agent", "manager") or not record.get("model"):
+                continue
+            role = f"agent {record['agent']}" if record["type"] == "agent" else f"manager {record['decision']}"
+            groups.setdefault((role, record["model"]), []).append(record)
+
+        for (role, model), group in groups.items():
+            seconds = [record["seconds"] for record in group]
+            first_tokens = [record["first_token_seconds"] for record in group if record.get("first_token_seconds") is not None]
+            prompt_tokens = sum(record.get("prompt_tokens") or 0 for record in group)
+            completion_tokens = sum(record.get("completion_tokens") or 0 for record in group)
+            cost = self.cost(model, prompt_tokens, completion_tokens)
+            # Without reported usage, the completion tokens are estimated and the prompt tokens are missing from the cost
+            estimated = "~" if any(record.get("tokens_estimated") for record in group) else ""
+            rows.append([
+                role,
+                f"{model} ({self.tier(model)})",
+                str(len(group)),
+                f"{sum(seconds) / len(seconds):.2f}s",
+                f"{sum(first_tokens) / len(first_tokens):.2f}s" if first_tokens else "",
+                str(prompt_tokens),
+                estimated + str(completion_tokens),
+                f"{estimated}${cost:.4f}" if cost is not None else "",
+            ])
+        return rows
+
+    def print_comparison(self, records: list[dict]):
+        """Print the comparison of the tiers and the cost of the run compared to using the large tier for everything."""
+        rows = self.comparison(records)
+        widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+        print("**Model Tiers**:")
+        print(f"-- Large: {self.large}, small: {self.small} for {', '.join(self.small_roles)}")
+        for row in rows:
+            print("-- " + " | ".join(cell.ljust(width) if index < 2 else cell.rjust(width) for index, (cell, width) in enumerate(zip(row, widths))))
+
+        calls = [record for record in records if record["type"] in ("agent", "manager") and record.get("model")]
+        escalations = sum(1 for record in calls if record.get("escalated"))
+        if escalations:
+            print(f"-- {escalations} decisions escalated to {self.large} after invalid structured output")
+        costs = [self.cost(record["model"], record.get("prompt_tokens") or 0, record.get("completion_tokens") or 0) for record in calls]
+        large_costs = [self.cost(self.large, record.get("prompt_tokens") or 0, record.get("completion_tokens") or 0) for record in calls]
+        if calls and None not in costs and None not in large_costs:
+            cost, large_cost = sum(costs), sum(large_costs)
+            saved = f", {1 - cost / large_cost:.0%} saved" if large_cost > 0 else ""
+            estimated = "~" if any(record.get("tokens_estimated") for record in calls) else ""
+            print(f"-- Cost: {estimated}${cost:.4f} ({estimated}${large_cost:.4f} for the same tokens on {self.large}{saved})")
+        elif calls:
+            print("-- Cost: unknown, set MODEL_PRICES to price the deployments")
@@ -0,0 +1,356 @@
+"""Offline benchmark of the group chat orchestration with scripted model and agent backends.
+
+The chat manager and the agents are driven through the InProcessRuntime like in app_factory.py, but the
+chat manager's service and the agents' services replay a transcript with injected latency instead of
+calling a model. This separates the overhead of the orchestration from the latency of the model:
+
+    python orchestration_benchmark.py --max-rounds 5 10 15 --message-sizes 1000 10000 50000
+    python orchestration_benchmark.py --transcript recorded.json --fused-manager
+"""
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import tempfile
+import time
+from typing import Any, override
+
+from pydantic import PrivateAttr
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.agents.orchestration.group_chat import BooleanResult, MessageResult, StringResult
+from semantic_kernel.agents.runtime import InProcessRuntime
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent, StreamingChatMessageContent
+
+from app_factory_chat_manager import AppFactoryChatManager, ManagerDecision
+from app_factory_orchestration import AppFactoryGroupChatOrchestration
+from artifact_store import ArtifactStore
+from manager_context import ManagerContextBuilder
+from speaker_selector import RuleBasedSpeakerSelector
+from stream_renderer import StreamRenderer
+
+
+AGENT_DESCRIPTIONS = {
+    "Developer": "A developer that writes the code of the web app.",
+    "FileManager": "A file manager that saves the code to the session directory.",
+    "QualityAssurance": "A quality assurance agent that tests the web app in the browser.",
+    "CallOperator": "A call operator that calls a human expert to review the web app.",
+}
+
+AGENT_COLORS = {
+    "Developer": "\033[38;2;92;207;230m",
+    "FileManager": "\033[38;2;255;209;115m",
+    "QualityAssurance": "\033[38;2;213;255;128m",
+    "CallOperator": "\033[38;2;242;135;121m",
+}
+
+
+@dataclass
+class TranscriptEntry:
+    name: str
+    content: str
+
+
+class Transcript:
+    """A sequence of agent messages that the scripted services replay in order.
+
+    The chat manager's service selects the speaker of the next entry and ends the discussion when all entries
+    were replayed. The agent that speaks replays the content of the next entry.
+    """
+
+    def __init__(self, entries: list[TranscriptEntry]):
+        self.entries = entries
+        self.position = 0
+
+    @classmethod
+    def load(cls, path: str) -> "Transcript":
+        """Load a recorded transcript, a JSON list of objects with the agent name and message content."""
+        with open(path, encoding="utf-8") as file:
+            return cls([TranscriptEntry(entry["name"], entry["content"]) for entry in json.load(file)])
+
+    @classmethod
+    def synthetic(cls, rounds: int, message_size: int) -> "Transcript":
+        """Create a transcript of the app factory workflow, with code and test logs of about message_size characters."""
+        code_line = "    <div class=\"item\">Lorem ipsum dolor sit amet</div>\n"
+        code = "<!DOCTYPE html>\n" + code_line * max(1, message_size // len(code_line))
+        log_line = "PASS: element is visible and has the expected text\n"
+        log = log_line * max(1, message_size // 4 // len(log_line))
+        cycle = [
+            TranscriptEntry("Developer", f"Here is the web app.\n\n**index.html**\n```html\n{code}```"),
+            TranscriptEntry("FileManager", "The file index.html was saved to the session directory."),
+            TranscriptEntry("QualityAssurance", f"All tests passed.\n\n```\n{log}```"),
+            TranscriptEntry("CallOperator", "The expert approved the web app."),
+        ]
+        return cls([cycle[index % len(cycle)] for index in range(rounds)])
+
+    @property
+    def done(self) -> bool:
+        return self.position >= len(self.entries)
+
+    def next_speaker(self) -> str:
+        return self.entries[min(self.position, len(self.entries) - 1)].name
+
+    def next_content(self) -> str:
+        entry = self.entries[min(self.position, len(self.entries) - 1)]
+        self.position += 1
+        return entry.content
+
+
+class ScriptedService(ChatCompletionClientBase):
+    """Base class of the scripted chat completion services, which records the injected latency and the request sizes."""
+
+    latency: float = 0.0
+    transcript: Any = None
+    sleep_time: float = 0.0
+    calls: int = 0
+    max_history_messages: int = 0
+    max_history_characters: int = 0
+
+    def __init__(self, transcript: Transcript, latency: float, ai_model_id: str = "scripted"):
+        super().__init__(ai_model_id=ai_model_id, transcript=transcript, latency=latency)
+
+    async def _sleep(self, latency: float):
+        started = time.perf_counter()
+        await asyncio.sleep(latency)
+        self.sleep_time += time.perf_counter() - started
+
+    def _record(self, chat_history: ChatHistory):
+        self.calls += 1
+        self.max_history_messages = max(self.max_history_messages, len(chat_history.messages))
+        self.max_history_characters = max(
+            self.max_history_characters, sum(len(message.content or "") for message in chat_history.messages)
+        )
+
+
+class ScriptedManagerService(ScriptedService):
+    """Replaces the chat manager's model: answers the structured-output requests of AppFactoryChatManager from the transcript."""
+
+    @override
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> list[ChatMessageContent]:
+        self._record(chat_history)
+        await self._sleep(self.latency)
+
+        response_format = settings.extension_data.get("response_format")
+        instruction = chat_history.messages[-1].content or ""
+        if response_format is BooleanResult:
+            content = BooleanResult(result=self.transcript.done, reason="Scripted termination decision")
+        elif response_format is ManagerDecision:
+            content = ManagerDecision(
+                should_terminate=self.transcript.done,
+                termination_reason="Scripted termination decision",
+                next_agent=self.transcript.next_speaker(),
+                selection_reason="Scripted selection",
+            )
+        elif "summarize" in instruction:
+            content = StringResult(result="The web app was developed, saved, tested and approved.", reason="Scripted summary")
+        else:
+            content = StringResult(result=self.transcript.next_speaker(), reason="Scripted selection")
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=content.model_dump_json())]
+
+
+class ScriptedAgentService(ScriptedService):
+    """Replaces the agents' model: replays the next transcript entry, streamed in chunks after the injected latency."""
+
+    chunk_size: int = 50
+
+    @override
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> list[ChatMessageContent]:
+        self._record(chat_history)
+        await self._sleep(self.latency)
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=self.transcript.next_content())]
+
+    @override
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[list[StreamingChatMessageContent], Any]:
+        self._record(chat_history)
+        await self._sleep(self.latency)
+        content = self.transcript.next_content()
+        for start in range(0, len(content), self.chunk_size):
+            yield [StreamingChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                content=content[start:start + self.chunk_size],
+                choice_index=0,
+            )]
+
+
+class TimedChatManager(AppFactoryChatManager):
+    """A chat manager that measures the time spent in its hooks."""
+
+    _hook_time: float = PrivateAttr(default=0.0)
+
+    async def _timed(self, coroutine):
+        started = time.perf_counter()
+        try:
+            return await coroutine
+        finally:
+            self._hook_time += time.perf_counter() - started
+
+    @override
+    async def should_terminate(self, chat_history: ChatHistory) -> BooleanResult:
+        return await self._timed(super().should_terminate(chat_history))
+
+    @override
+    async def select_next_agent(self, chat_history: ChatHistory, participant_descriptions: dict[str, str]) -> StringResult:
+        return await self._timed(super().select_next_agent(chat_history, participant_descriptions))
+
+    @override
+    async def filter_results(self, chat_history: ChatHistory) -> MessageResult:
+        return await self._timed(super().filter_results(chat_history))
+
+
+@dataclass
+class BenchmarkResult:
+    max_rounds: int
+    message_size: int
+    rounds: int = 0
+    wall_time: float = 0.0
+    manager_time: float = 0.0
+    manager_sleep: float = 0.0
+    manager_calls: int = 0
+    agent_sleep: float = 0.0
+    max_history_messages: int = 0
+    max_history_characters: int = 0
+    callback_time: float = 0.0
+    callback_chunks: int = 0
+    rendered_characters: int = 0
+    render_batches: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def manager_overhead_per_round(self) -> float:
+        return (self.manager_time - self.manager_sleep) / max(self.rounds, 1)
+
+    @property
+    def orchestration_overhead(self) -> float:
+        return self.wall_time - self.manager_sleep - self.agent_sleep
+
+
+async def run_benchmark(transcript: Transcript, max_rounds: int, message_size: int, args) -> BenchmarkResult:
+    """Run one orchestration over the transcript and measure it."""
+    result = BenchmarkResult(max_rounds=max_rounds, message_size=message_size)
+
+    agent_service = ScriptedAgentService(transcript, latency=args.agent_latency)
+    members = [
+        ChatCompletionAgent(name=name, description=description, instructions=description, service=agent_service)
+        for name, description in AGENT_DESCRIPTIONS.items()
+    ]
+    manager_service = ScriptedManagerService(transcript, latency=args.manager_latency)
+    manager = TimedChatManager(
+        manager_service,
+        max_rounds=max_rounds,
+        fused_decisions=args.fused_manager,
+        speaker_selector=None if args.no_fast_path else RuleBasedSpeakerSelector(),
+        context_builder=ManagerContextBuilder(token_budget=args.manager_context_tokens) if args.manager_context_tokens > 0 else None,
+    )
+
+    rendered = io.StringIO()
+    renderer = StreamRenderer(agent_colors=AGENT_COLORS, stream=rendered, quiet=args.quiet)
+
+    async def streaming_callback(message: StreamingChatMessageContent, is_last: bool) -> None:
+        started = time.perf_counter()
+        await renderer.render(message, is_last)
+        result.callback_time += time.perf_counter() - started
+        result.callback_chunks += 1
+
+    with tempfile.TemporaryDirectory() as session_dir:
+        response_processors = [] if args.no_artifact_handles else [ArtifactStore(session_dir).process]
+        orchestration = AppFactoryGroupChatOrchestration(
+            members=members,
+            manager=manager,
+            response_processors=response_processors,
+            agent_response_callback=manager.observe,
+            streaming_agent_response_callback=streaming_callback,
+        )
+
+        runtime = InProcessRuntime()
+        runtime.start()
+        started = time.perf_counter()
+        # The chat manager and the processors print their progress, which is not part of the measured rendering
+        with contextlib.redirect_stdout(io.StringIO()):
+            orchestration_result = await orchestration.invoke(task="Create a web app that shows a list of items.", runtime=runtime)
+            await orchestration_result.get(timeout=args.timeout)
+            await renderer.close()
+        result.wall_time = time.perf_counter() - started
+        await runtime.stop_when_idle()
+
+    result.rounds = transcript.position
+    result.manager_time = manager._hook_time
+    result.manager_sleep = manager_service.sleep_time
+    result.manager_calls = manager_service.calls
+    result.agent_sleep = agent_service.sleep_time
+    result.max_history_messages = manager_service.max_history_messages
+    result.max_history_characters = manager_service.max_history_characters
+    result.rendered_characters = len(rendered.getvalue())
+    result.render_batches = renderer.batches
+    return result
+
+
+def print_results(results: list[BenchmarkResult]):
+    print("**Orchestration Benchmark**:")
+    columns = [
+        ("max rounds", lambda result: f"{result.max_rounds}"),
+        ("msg size", lambda result: f"{result.message_size}"),
+        ("rounds", lambda result: f"{result.rounds}"),
+        ("wall", lambda result: f"{result.wall_time:.2f}s"),
+        ("orch. overhead", lambda result: f"{result.orchestration_overhead * 1000:.1f}ms"),
+        ("mgr calls", lambda result: f"{result.manager_calls}"),
+        ("mgr overhead/round", lambda result: f"{result.manager_overhead_per_round * 1000:.2f}ms"),
+        ("max history msgs", lambda result: f"{result.max_history_messages}"),
+        ("max history chars", lambda result: f"{result.max_history_characters}"),
+        ("callback", lambda result: f"{result.callback_time * 1000:.1f}ms / {result.callback_chunks} chunks / {result.render_batches} writes"),
+    ]
+    rows = [[name for name, _ in columns]] + [[render(result) for _, render in columns] for result in results]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    for row in rows:
+        print("-- " + " | ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+async def main(args):
+    results = []
+    for max_rounds in args.max_rounds:
+        for message_size in args.message_sizes:
+            for _ in range(args.repeat):
+                if args.transcript:
+                    transcript = Transcript.load(args.transcript)
+                else:
+                    # One more entry than rounds, so that the run ends at max_rounds
+                    transcript = Transcript.synthetic(max_rounds + 1, message_size)
+                results.append(await run_benchmark(transcript, max_rounds, message_size, args))
+    print_results(results)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the group chat orchestration offline with scripted model backends.")
+    parser.add_argument("--max-rounds", type=int, nargs="+", default=[5, 10, 15], help="Values of max_rounds of the chat manager")
+    parser.add_argument("--message-sizes", type=int, nargs="+", default=[1000, 10000], help="Approximate sizes of the code and test messages in characters")
+    parser.add_argument("--transcript", help="Replay a recorded transcript (JSON list of {name, content}) instead of a synthetic one")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs per configuration")
+    parser.add_argument("--manager-latency", type=float, default=0.0, help="Injected latency of each chat manager call in seconds")
+    parser.add_argument("--agent-latency", type=float, default=0.0, help="Injected latency of each agent response in seconds")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout of each run in seconds")
+    parser.add_argument("--fused-manager", action="store_true", help="Decide on termination and the next speaker in one call")
+    parser.add_argument("--no-fast-path", action="store_true", help="Always ask the chat manager's model for the next speaker")
+    parser.add_argument("--manager-context-tokens", type=int, default=8000, help="Token budget of the chat manager's history (0 for the full history)")
+    parser.add_argument("--no-artifact-handles", action="store_true", help="Share code in the group chat as full text")
+    parser.add_argument("--quiet", action="store_true", help="Do not render the streamed agent responses")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,33 +1,51 @@
-from typing import Annotated
-import threading
-import time
+from typing import TYPE_CHECKING, Annotated
+import asyncio
 from semantic_kernel.functions import kernel_function
-from call_server import CallServer
+
+if TYPE_CHECKING:
+    from call_server import CallServer
 
 class CallPlugin:
-    """A Plugin used for calling operations."""
+    """A Plugin used for calling operations.
+
+    The call server is created and started on the first call, as most runs never reach the review step.
+    """
 
-    def __init__(self):
+    def __init__(self, call_server: "CallServer" = None, target_phone_number: str = None, timeout_seconds: float = 60):
         self.name = "calling"
-        self.call_server = CallServer()
-        self._start_call_server()
+        self.timeout_seconds = timeout_seconds
+        self.target_phone_number = target_phone_number
+        # The call of this plugin that is in flight, other plugins may share the call server
+        self.call_connection_id = None
+        self._call_server = call_server
+
+    @property
+    def call_server(self) -> "CallServer":
+        if self._call_server is None:
+            from call_server import CallServer
+
+            self._call_server = CallServer()
+        return self._call_server
 
     def _start_call_server(self):
-        """Start the call server in a background thread."""
-        server_thread = threading.Thread(target=self.call_server.run, kwargs={'port': 8080}, daemon=True)
-        server_thread.start()
+        """Start the call server in a background thread, unless it is running already."""
+        self.call_server.start(port=8080)
 
-    @kernel_function(description="Make a call with the specified message and wait up to 60 seconds for a response.")
-    def make_call_and_wait(self, message: Annotated[str, "The message to send in the call."]) -> str:
-        """Make a call and wait for the response with a 60-second timeout."""
-        # Check if there's already an active call
-        if self.call_server.is_call_active():
+    @kernel_function(description="Make a call with the specified message and wait for the response of the expert.")
+    async def make_call_and_wait(self, message: Annotated[str, "The message to send in the call."]) -> str:
+        """Make a call and wait for the response without blocking the event loop."""
+        # Check if there's already an active call for this plugin
+        if self.call_connection_id and self.call_server.is_call_active(self.call_connection_id):
             return "A call is already active. Only one call at a time is supported."
         
+        self._start_call_server()
+
         # Initialize the call
-        result = self.call_server.make_call(
+        result = await asyncio.to_thread(
+            self.call_server.make_call,
             start_message=message,
-            end_message="Thank you for your response. Goodbye."
+            end_message="Thank you for your response. Goodbye.",
+            target_phone_number=self.target_phone_number,
         )
         
         if "error" in result:
@@ -36,29 +54,19 @@ class CallPlugin:
         call_connection_id = result.get("call_connection_id")
         if not call_connection_id:
             return "Failed to initiate call"
+        self.call_connection_id = call_connection_id
         
-        # Wait for the response with timeout
-        start_time = time.time()
-        timeout_seconds = 60
-        
-        while time.time() - start_time < timeout_seconds:
-            # Check if we have a response
-            response = self.call_server.get_call_response()
-            if response:
-                return f"Response received: {response}"
-            
-            # Check call status
-            status = self.call_server.get_call_status()
-            if status == 'completed':
-                return "Call completed but no response was captured."
-            elif status == 'failed':
-                return "Call failed. No response received."
-            elif status == 'idle':
-                return "Call ended without a response."
-            
-            # Wait a bit before checking again
-            time.sleep(1)
+        # Wait until the call server signals a response or the end of the call
+        response, status = await self.call_server.wait_for_call(call_connection_id, timeout=self.timeout_seconds)
+
+        if status == 'failed':
+            return "Call failed. No response received."
+        elif response:
+            return f"Response received: {response}"
+        elif status == 'completed':
+            return "Call completed but no response was captured."
+        elif status == 'idle':
+            return "Call ended without a response."
         
         # Timeout reached
-        current_status = self.call_server.get_call_status()
-        return f"Timeout after {timeout_seconds} seconds. Call status: {current_status}. No response received."
\ No newline at end of file
+        return f"Timeout after {self.timeout_seconds} seconds. Call status: {status}. No response received."
@@ -1,32 +1,206 @@
 from typing import Annotated
+import hashlib
 import os
+import tempfile
 from semantic_kernel.functions import kernel_function
+from semantic_kernel.kernel_pydantic import KernelBaseModel
+from artifact_store import ArtifactStore
+from file_patch import PatchConflictError, apply_file_patch, apply_search_replace, parse_unified_diff
+
+
+def _get_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# The umask is read once, since it can only be read by setting it, which is not safe while files are written
+UMASK = _get_umask()
+
+
+class FileContent(KernelBaseModel):
+    """A file to be written by the file plugin."""
+
+    path: Annotated[str, "The relative path of the file, incl. file name and extension."]
+    content: Annotated[str, "The content of the file or an artifact handle."]
+
+
+class FileEdit(KernelBaseModel):
+    """A search/replace edit of a file."""
+
+    search: Annotated[str, "The exact text to replace. It must occur exactly once in the file."]
+    replace: Annotated[str, "The text to replace it with."]
 
 
 class FilePlugin:
     """A Plugin used for file operations."""
 
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, artifact_store: ArtifactStore = None):
         self.base_dir = base_dir
         self.name = "file"
+        self.artifact_store = artifact_store
+
 
+    def _full_path(self, path: str) -> str:
+        """Resolve a relative path, making sure it stays inside the base directory."""
+        full_path = os.path.abspath(os.path.join(self.base_dir, path))
+        if os.path.commonpath([full_path, os.path.abspath(self.base_dir)]) != os.path.abspath(self.base_dir):
+            raise ValueError(f"The path {path} is outside of the working directory.")
+        return full_path
 
-    @kernel_function(description="Create a file with the provided content at the provided location.")
+
+    def _write_file(self, path: str, content: str) -> tuple[bool, int]:
+        """Write a file atomically, unless it already has the same content.
+
+        Returns whether the file changed and the number of characters of the resolved content.
+        """
+        if self.artifact_store:
+            content = self.artifact_store.resolve(content)
+        data = content.encode("utf-8")
+        full_path = self._full_path(path)
+
+        # Temporary files are only readable by the owner, the file gets the mode of the file it replaces or
+        # the mode of a new file instead
+        mode = 0o666 & ~UMASK
+        if os.path.isfile(full_path):
+            with open(full_path, 'rb') as file:
+                if hashlib.sha256(file.read()).digest() == hashlib.sha256(data).digest():
+                    return False, len(content)
+            mode = os.stat(full_path).st_mode & 0o7777
+
+        # Write to a temporary file first, so that readers never see a half-written file
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                file.write(data)
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return True, len(content)
+
+
+    @kernel_function(description="Create a file with the provided content at the provided location. The content can be an artifact handle like [artifact index.html | 2048 bytes | sha256:0123456789ab].")
     def create_file(
         self,
-        content: Annotated[str, "The content of the file."],
+        content: Annotated[str, "The content of the file or an artifact handle."],
         path: Annotated[str, "The relative path of the file, incl. file name and extension."],
     ) -> str:
         print(f"\n**{self.name}-create_file**: Writing file to {path}...\n")
         try:
-            full_path = os.path.join(self.base_dir, path)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, 'w') as file:
-                file.write(content)
-            return f"File successfully written to {path} ({len(content)} characters)"
+            changed, characters = self._write_file(path, content)
+            if not changed:
+                return f"File {path} is unchanged ({characters} characters)"
+            return f"File successfully written to {path} ({characters} characters)"
         except Exception as e:
             return f"An error occurred while creating the file at {path}: {str(e)}"
-        
+
+
+    @kernel_function(description="Create or update several files in one call. Files whose content is unchanged are skipped. Contents can be artifact handles.")
+    def create_files(
+        self,
+        files: Annotated[list[FileContent], "The files to write, each with a relative path and content."],
+    ) -> str:
+        print(f"\n**{self.name}-create_files**: Writing {len(files)} files to {', '.join(file.path for file in files)}...\n")
+        results = []
+        changed_files = []
+        failed = False
+        for file in files:
+            try:
+                changed, characters = self._write_file(file.path, file.content)
+                if changed:
+                    changed_files.append(file.path)
+                    results.append(f"- {file.path}: written ({characters} characters)")
+                else:
+                    results.append(f"- {file.path}: unchanged ({characters} characters)")
+            except Exception as e:
+                failed = True
+                results.append(f"- {file.path}: error: {str(e)}")
+
+        if failed:
+            summary = "An error occurred while writing some of the files."
+        else:
+            summary = f"Files successfully written ({len(changed_files)} changed, {len(files) - len(changed_files)} unchanged)."
+        if changed_files:
+            summary += f" Changed files: {', '.join(changed_files)}."
+        return "\n".join([summary, *results])
+
+
+    def _read_file(self, path: str) -> str:
+        with open(self._full_path(path), 'rb') as file:
+            return file.read().decode("utf-8")
+
+
+    def _write_edits(self, new_contents: dict[str, str], sent_bytes: int) -> str:
+        """Write edited files and report the bytes sent compared to a full rewrite."""
+        changed_files = []
+        for path, content in new_contents.items():
+            changed, _ = self._write_file(path, content)
+            if changed:
+                changed_files.append(path)
+
+        rewrite_bytes = sum(len(content.encode("utf-8")) for content in new_contents.values())
+        saved = 1 - sent_bytes / rewrite_bytes if rewrite_bytes else 0
+        print(f"\n**{self.name}-edit**: Sent {sent_bytes} bytes instead of {rewrite_bytes} bytes for a full rewrite ({saved:.0%} saved).\n")
+        return (
+            f"Edits successfully applied to {', '.join(new_contents)}. "
+            f"Changed files: {', '.join(changed_files) if changed_files else 'none'}. "
+            f"Sent {sent_bytes} bytes instead of {rewrite_bytes} bytes for a full rewrite."
+        )
+
+
+    @kernel_function(description="Apply a unified diff to one or more existing files. Use this for small changes instead of rewriting whole files. The patch can be an artifact handle.")
+    def apply_patch(
+        self,
+        patch: Annotated[str, "The unified diff with --- / +++ file headers and @@ hunks, or an artifact handle."],
+    ) -> str:
+        print(f"\n**{self.name}-apply_patch**: Applying patch...\n")
+        try:
+            if self.artifact_store:
+                patch = self.artifact_store.resolve(patch)
+            new_contents = {}
+            for file_patch in parse_unified_diff(patch):
+                if file_patch.is_new_file:
+                    original = ""
+                else:
+                    original = new_contents.get(file_patch.path)
+                    if original is None:
+                        original = self._read_file(file_patch.path)
+                new_contents[file_patch.path] = apply_file_patch(original, file_patch)
+            # Files are only written once all hunks of all files applied
+            return self._write_edits(new_contents, len(patch.encode("utf-8")))
+        except PatchConflictError as e:
+            return f"Patch conflict, no files were changed: {str(e)}"
+        except Exception as e:
+            return f"An error occurred while applying the patch: {str(e)}"
+
+
+    @kernel_function(description="Apply search/replace edits to an existing file. Each search text must occur exactly once in the file.")
+    def replace_in_file(
+        self,
+        path: Annotated[str, "The relative path of the file, incl. file name and extension."],
+        edits: Annotated[list[FileEdit], "The edits to apply in order."],
+    ) -> str:
+        print(f"\n**{self.name}-replace_in_file**: Applying {len(edits)} edits to {path}...\n")
+        try:
+            content = self._read_file(path)
+            for index, edit in enumerate(edits):
+                try:
+                    content = apply_search_replace(content, edit.search, edit.replace)
+                except PatchConflictError as e:
+                    raise PatchConflictError(f"Edit {index + 1}: {str(e)}") from e
+            sent_bytes = sum(len(edit.search.encode("utf-8")) + len(edit.replace.encode("utf-8")) for edit in edits)
+            return self._write_edits({path: content}, sent_bytes)
+        except PatchConflictError as e:
+            return f"Edit conflict, the file was not changed: {str(e)}"
+        except Exception as e:
+            return f"An error occurred while editing the file at {path}: {str(e)}"
+
+
     @kernel_function(description="Check if a file exists")
     def file_exists(
         self,
@@ -34,4 +208,4 @@ class FilePlugin:
     ) -> bool:
         """Check if a file exists in the base directory."""
         full_path = os.path.join(self.base_dir, file_name)
-        return os.path.isfile(full_path)
\ No newline at end of file
+        return os.path.isfile(full_path)
@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Annotated
+import hashlib
+import json
+import os
+from semantic_kernel.functions import kernel_function
+
+
+CACHE_FILE_NAME = ".qa_test_cache.json"
+
+
+class QaTestCachePlugin:
+    """A Plugin that records QA test results with the hashes of the files they exercised.
+
+    Tests whose files are unchanged since they passed do not have to be run again.
+    """
+
+    def __init__(self, base_dir: str = None):
+        self.base_dir = base_dir
+        self.name = "test_cache"
+        self.cache_path = os.path.join(base_dir, CACHE_FILE_NAME)
+        self.tests: dict[str, dict] = self._load()
+
+
+    def _load(self) -> dict[str, dict]:
+        if not os.path.isfile(self.cache_path):
+            return {}
+        with open(self.cache_path, encoding="utf-8") as file:
+            return json.load(file)
+
+
+    def _save(self):
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.tests, file, indent=2)
+        os.replace(temp_path, self.cache_path)
+
+
+    def _session_files(self) -> list[str]:
+        files = []
+        for root, dirs, names in os.walk(self.base_dir):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in names:
+                if not name.startswith("."):
+                    files.append(os.path.relpath(os.path.join(root, name), self.base_dir).replace(os.sep, "/"))
+        return sorted(files)
+
+
+    def _hash(self, path: str) -> str | None:
+        full_path = os.path.join(self.base_dir, path)
+        if not os.path.isfile(full_path):
+            return None
+        with open(full_path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+
+    def _changed_files(self, test: dict) -> list[str]:
+        return [path for path, file_hash in test["files"].items() if self._hash(path) != file_hash]
+
+
+    @kernel_function(description="Get the recorded test cases and whether they have to be run again because their files changed or they failed. Call this before testing.")
+    def get_test_plan(self) -> str:
+        if not self.tests:
+            return "No test cases have been recorded yet. Design and run the test cases, and record each result."
+
+        lines = []
+        cached, reruns = 0, 0
+        for name, test in self.tests.items():
+            changed = self._changed_files(test)
+            if test["passed"] and not changed:
+                cached += 1
+                lines.append(f"- {name}: passed (cached), its files are unchanged ({', '.join(test['files'])}). Do not run it again.")
+            else:
+                reruns += 1
+                reason = f"changed files: {', '.join(changed)}" if changed else "it failed last time"
+                lines.append(f"- {name}: run again, {reason}. Test: {test['description']}")
+        print(f"\n**{self.name}-get_test_plan**: {cached} cached passes, {reruns} tests to run again\n")
+        return "\n".join([f"Recorded test cases ({cached} cached passes, {reruns} to run again):", *lines])
+
+
+    @kernel_function(description="Record the result of a test case together with the session files it exercised.")
+    def record_test_result(
+        self,
+        name: Annotated[str, "A short, unique name of the test case."],
+        description: Annotated[str, "What the test case does and checks."],
+        passed: Annotated[bool, "Whether the test passed."],
+        files: Annotated[list[str], "The relative paths of the session files the test exercised, e.g. index.html and script.js. Leave empty for all files."] = None,
+        details: Annotated[str, "The observed result."] = "",
+    ) -> str:
+        print(f"\n**{self.name}-record_test_result**: {name} {'passed' if passed else 'failed'}\n")
+        files = files or self._session_files()
+        hashes = {path: self._hash(path) for path in files}
+        missing = [path for path, file_hash in hashes.items() if file_hash is None]
+        if missing:
+            return f"The files {', '.join(missing)} do not exist in the session directory. Record the result with existing files."
+
+        self.tests[name] = {
+            "description": description,
+            "passed": passed,
+            "details": details,
+            "files": hashes,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save()
+        return f"Result of {name} recorded for {', '.join(files)}."
@@ -0,0 +1,179 @@
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import json
+import time
+
+from opentelemetry.trace import Tracer
+from semantic_kernel.contents import ChatMessageContent
+from semantic_kernel.filters import FunctionInvocationContext
+
+from manager_context import estimate_tokens
+
+
+# Order of the record types in the summary
+RECORD_TYPES = ["agent", "manager", "tool", "processing"]
+
+
+def _usage(message: ChatMessageContent | None) -> tuple[int | None, int, bool]:
+    """Get the prompt and completion tokens of a response.
+
+    If the service reports no usage, the completion tokens are estimated from the content and the prompt tokens are unknown.
+    """
+    usage = (message.metadata or {}).get("usage") if message else None
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is None or completion_tokens is None:
+        return None, estimate_tokens(message.content or "") if message else 0, True
+    return prompt_tokens, completion_tokens, False
+
+
+class RunRecorder:
+    """Records the latency and token usage of each round of a run.
+
+    Every record is a dict with a type ('agent', 'processing', 'tool' or 'manager') and the round it belongs to.
+    A round starts when an agent starts to respond; the manager decisions after the response belong to the same round.
+    Records are written as JSON lines to the metrics file and, if a tracer is given, exported as OpenTelemetry spans.
+    """
+
+    def __init__(self, path: str | None = None, tracer: Tracer | None = None):
+        self.path = path
+        self.tracer = tracer
+        self.records: list[dict] = []
+        self.round = 0
+        self.current_agent: str | None = None
+        # The agent and round of the current task, as agents of independent steps respond at the same time
+        self._task_agent: ContextVar[str | None] = ContextVar("agent", default=None)
+        self._task_round: ContextVar[int | None] = ContextVar("round", default=None)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def record(self, record_type: str, started: float, seconds: float, **attributes) -> dict:
+        """Add a record of something that started at the given wall clock time and took the given seconds."""
+        record = {
+            "type": record_type,
+            "round": self._task_round.get() or self.round,
+            "time": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+            "seconds": round(seconds, 4),
+            **attributes,
+        }
+        self.records.append(record)
+        if self._file:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+        if self.tracer:
+            name = " ".join(str(part) for part in (record_type, attributes.get("agent") or attributes.get("decision"), attributes.get("function")) if part)
+            span = self.tracer.start_span(
+                name,
+                start_time=int(started * 1e9),
+                attributes={key: value for key, value in record.items() if value is not None and key != "time"},
+            )
+            span.end(end_time=int((started + seconds) * 1e9))
+        return record
+
+    def start_agent(self, agent: str):
+        """Start a new round in which the given agent responds."""
+        self.round += 1
+        self.current_agent = agent
+        self._task_agent.set(agent)
+        self._task_round.set(self.round)
+
+    def record_agent(self, agent: str, started: float, seconds: float, first_token_seconds: float | None,
+                     render_seconds: float, response: ChatMessageContent | None, model: str | None = None):
+        prompt_tokens, completion_tokens, estimated = _usage(response)
+        self.record(
+            "agent", started, seconds,
+            agent=agent,
+            model=model,
+            first_token_seconds=round(first_token_seconds, 4) if first_token_seconds is not None else None,
+            render_seconds=round(render_seconds, 4),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tokens_estimated=estimated,
+        )
+
+    def record_manager(self, decision: str, started: float, seconds: float, response: ChatMessageContent | None = None,
+                       model: str | None = None, escalated: bool = False):
+        """Record a decision of the chat manager. Decisions without a response were made without a model call.
+
+        Escalated decisions were repeated with the large model after the small model returned invalid structured output.
+        """
+        prompt_tokens, completion_tokens, estimated = _usage(response) if response else (0, 0, False)
+        self.record(
+            "manager", started, seconds,
+            decision=decision,
+            model=model,
+            escalated=escalated,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tokens_estimated=estimated,
+        )
+
+    async def function_invocation_filter(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        """Kernel filter that records the duration of each tool call of an agent."""
+        started, start_counter = time.time(), time.perf_counter()
+        error = None
+        try:
+            await next(context)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self.record(
+                "tool", started, time.perf_counter() - start_counter,
+                agent=self._task_agent.get() or self.current_agent,
+                plugin=context.function.plugin_name,
+                function=context.function.name,
+                error=error,
+            )
+
+    def summary(self) -> list[list[str]]:
+        """Summarize the records per agent, manager decision and tool as table rows."""
+        rows = [["", "count", "total", "avg", "max", "avg TTFT", "prompt tok", "completion tok"]]
+        groups: dict[str, list[dict]] = {}
+        for record in sorted(self.records, key=lambda record: RECORD_TYPES.index(record["type"])):
+            if record["type"] == "agent":
+                key = f"agent {record['agent']}"
+            elif record["type"] == "manager":
+                key = f"manager {record['decision']}"
+            elif record["type"] == "tool":
+                key = f"tool {record['plugin']}-{record['function']}"
+            else:
+                key = record["type"]
+            groups.setdefault(key, []).append(record)
+
+        for key, records in groups.items():
+            seconds = [record["seconds"] for record in records]
+            first_tokens = [record["first_token_seconds"] for record in records if record.get("first_token_seconds") is not None]
+            prompt_tokens = [record["prompt_tokens"] for record in records if record.get("prompt_tokens") is not None]
+            completion_tokens = [record["completion_tokens"] for record in records if "completion_tokens" in record]
+            estimated = any(record.get("tokens_estimated") for record in records)
+            rows.append([
+                key,
+                str(len(records)),
+                f"{sum(seconds):.2f}s",
+                f"{sum(seconds) / len(seconds):.2f}s",
+                f"{max(seconds):.2f}s",
+                f"{sum(first_tokens) / len(first_tokens):.2f}s" if first_tokens else "",
+                str(sum(prompt_tokens)) if prompt_tokens else "",
+                ("~" if estimated else "") + str(sum(completion_tokens)) if completion_tokens else "",
+            ])
+        return rows
+
+    def print_summary(self):
+        rows = self.summary()
+        widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+        print("**Run Metrics**:")
+        print(f"-- {self.round} rounds")
+        for row in rows:
+            print("-- " + " | ".join(cell.ljust(width) if index == 0 else cell.rjust(width) for index, (cell, width) in enumerate(zip(row, widths))))
+        if self.path:
+            print(f"-- Records written to {self.path}")
@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import json
+import os
+import shutil
+
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+
+
+SESSION_LOG_NAME = ".session_log.jsonl"
+
+
+@dataclass
+class SessionState:
+    """The state of a session rebuilt from its log."""
+
+    task: str
+    messages: list[ChatMessageContent] = field(default_factory=list)
+    # Last round the chat manager started and the file hashes logged last
+    round: int = 0
+    hashes: dict[str, str] = field(default_factory=dict)
+    finished: bool = False
+
+
+class SessionLog:
+    """An append-only log of a session, from which an interrupted session can be resumed.
+
+    At the start of each round, the chat manager logs the messages that were added to the chat history since
+    the last round and the hashes of the session files if they changed, followed by its decisions. Each entry
+    is a JSON line, so that everything up to the last completed round survives a crash or Ctrl-C.
+    """
+
+    def __init__(self, session_dir: str):
+        self.session_dir = session_dir
+        self.path = os.path.join(session_dir, SESSION_LOG_NAME)
+        self._logged_messages = 0
+        self._last_hashes: dict[str, str] = {}
+
+    def _append(self, entry_type: str, **attributes):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"type": entry_type, **attributes}, separators=(",", ":")) + "\n")
+
+    def _hashes(self) -> dict[str, str]:
+        hashes = {}
+        for root, dirs, names in os.walk(self.session_dir):
+            # Skip hidden directories and files such as the artifact store and this log
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in names:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, "rb") as file:
+                    hashes[os.path.relpath(path, self.session_dir).replace(os.sep, "/")] = hashlib.sha256(file.read()).hexdigest()
+        return hashes
+
+    def log_start(self, task: str):
+        self._append("start", task=task, time=datetime.now().isoformat(timespec="seconds"))
+
+    def log_round(self, current_round: int, chat_history: ChatHistory):
+        """Log the new messages of the chat history and the session files if they changed."""
+        for index, message in enumerate(chat_history.messages[self._logged_messages:], self._logged_messages):
+            self._append("message", round=current_round, index=index, role=message.role.value, name=message.name, content=message.content)
+        self._logged_messages = len(chat_history.messages)
+
+        hashes = self._hashes()
+        if hashes != self._last_hashes:
+            self._append("files", round=current_round, hashes=hashes)
+            self._last_hashes = hashes
+
+    def log_decision(self, current_round: int, decision: str, result: bool | str, reason: str):
+        self._append("decision", round=current_round, decision=decision, result=result, reason=reason)
+
+    def log_end(self, reason: str):
+        self._append("end", reason=reason, time=datetime.now().isoformat(timespec="seconds"))
+
+    @classmethod
+    def load(cls, session_dir: str) -> SessionState:
+        """Rebuild the state of a session from its log."""
+        path = os.path.join(session_dir, SESSION_LOG_NAME)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No session log found in {session_dir}.")
+
+        state = None
+        messages: dict[int, ChatMessageContent] = {}
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may have been cut off by a crash
+                    break
+                if entry["type"] == "start":
+                    state = SessionState(task=entry["task"])
+                elif state is None:
+                    continue
+                elif entry["type"] == "message":
+                    messages[entry["index"]] = ChatMessageContent(
+                        role=AuthorRole(entry["role"]), name=entry["name"], content=entry["content"],
+                    )
+                elif entry["type"] == "files":
+                    state.hashes = entry["hashes"]
+                elif entry["type"] == "decision":
+                    state.round = max(state.round, entry["round"])
+                elif entry["type"] == "end":
+                    state.finished = True
+
+        if state is None:
+            raise ValueError(f"The session log in {session_dir} has no start entry.")
+        state.messages = [messages[index] for index in sorted(messages)]
+        return state
+
+    def resume(self, state: SessionState) -> list[str]:
+        """Continue logging after the state of a loaded session and return the files that changed since it was logged."""
+        self._logged_messages = len(state.messages)
+        self._last_hashes = state.hashes
+        self._append("resume", round=state.round, time=datetime.now().isoformat(timespec="seconds"))
+        current = self._hashes()
+        return sorted(path for path in set(current) | set(state.hashes) if current.get(path) != state.hashes.get(path))
+
+
+def archive_session_dir(session_dir: str) -> str:
+    """Compress a finished session directory into sessions/archive and remove it."""
+    archive_dir = os.path.join(os.path.dirname(session_dir), "archive")
+    os.makedirs(archive_dir, exist_ok=True)
+    archive = shutil.make_archive(os.path.join(archive_dir, os.path.basename(session_dir)), "zip", session_dir)
+    shutil.rmtree(session_dir)
+    return archive
@@ -0,0 +1,117 @@
+from semantic_kernel.agents.orchestration.group_chat import StringResult
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+
+from artifact_store import HANDLE_PATTERN
+from code_writer import SAVED_FILES_MARKER
+from static_check import STATIC_CHECK_FAILED, STATIC_CHECK_MARKER
+
+
+class SpeakerSelector:
+    """A deterministic speaker selector that is consulted before the chat manager asks the LLM.
+
+    The selector observes all agent messages, including the intermediate function calls and results,
+    which are not part of the chat history the manager receives.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def observe(self, message: ChatMessageContent) -> None:
+        """Record an agent message or intermediate function call/result message."""
+        pass
+
+    def select(self, chat_history: ChatHistory, participant_descriptions: dict[str, str]) -> StringResult | None:
+        """Return the next speaker if it can be determined without the LLM, else None."""
+        result = self._select(chat_history, participant_descriptions)
+        if result and result.result in participant_descriptions:
+            self.hits += 1
+            return result
+        self.misses += 1
+        return None
+
+    def _select(self, chat_history: ChatHistory, participant_descriptions: dict[str, str]) -> StringResult | None:
+        return None
+
+
+class RuleBasedSpeakerSelector(SpeakerSelector):
+    """Selects the next speaker for the predictable transitions of the app factory workflow.
+
+    Developer writes code -> FileManager saves it (unless it was saved directly) -> QualityAssurance tests it. A failed call is retried by
+    the CallOperator. Test verdicts and expert feedback need to be interpreted and are left to the LLM.
+    If the static check of the saved files failed, the Developer fixes the problems before the browser test, up to
+    max_static_check_retries times in a row.
+    """
+
+    max_static_check_retries = 2
+
+    file_write_functions = {"create_file", "create_files", "apply_patch", "replace_in_file"}
+    file_write_failure_prefixes = ("An error occurred", "Patch conflict", "Edit conflict")
+    call_functions = {"make_call_and_wait"}
+    call_failure_prefixes = (
+        "Call failed",
+        "Call ended",
+        "Timeout",
+        "Failed to initiate",
+        "A call is already active",
+    )
+
+    def __init__(self):
+        super().__init__()
+        # Function results observed since the last selection, as (agent name, plugin name, function name, result)
+        self._events: list[tuple[str, str, str, str]] = []
+        # Number of failed static checks in a row
+        self._static_check_failures = 0
+
+    def observe(self, message: ChatMessageContent) -> None:
+        for item in message.items:
+            if item.content_type == 'function_result':
+                self._events.append((message.name, item.plugin_name, item.function_name, str(item.result)))
+
+    def _select(self, chat_history: ChatHistory, participant_descriptions: dict[str, str]) -> StringResult | None:
+        events, self._events = self._events, []
+
+        last_message = self._last_agent_message(chat_history)
+        if last_message is None:
+            return StringResult(result="Developer", reason="Fast path: the code has to be written first")
+
+        content = last_message.content or ""
+        if STATIC_CHECK_FAILED in content:
+            self._static_check_failures += 1
+            if self._static_check_failures > self.max_static_check_retries:
+                return None
+            return StringResult(result="Developer", reason="Fast path: the static check found problems that have to be fixed before testing in the browser")
+        if STATIC_CHECK_MARKER in content:
+            self._static_check_failures = 0
+
+        if last_message.name == "Developer":
+            if SAVED_FILES_MARKER in content:
+                report = content.split(SAVED_FILES_MARKER)[-1]
+                if any(prefix in report for prefix in self.file_write_failure_prefixes):
+                    return None
+                return StringResult(result="QualityAssurance", reason="Fast path: the code was saved directly and needs to be tested")
+            if "```" in content or HANDLE_PATTERN.search(content):
+                return StringResult(result="FileManager", reason="Fast path: the Developer provided code that needs to be saved")
+            return None
+
+        if last_message.name == "FileManager":
+            writes = [result for _, _, function, result in events if function in self.file_write_functions]
+            if writes and not any(result.startswith(self.file_write_failure_prefixes) for result in writes):
+                return StringResult(result="QualityAssurance", reason="Fast path: the files were saved and need to be tested")
+            return None
+
+        if last_message.name == "CallOperator":
+            calls = [result for _, _, function, result in events if function in self.call_functions]
+            if calls and calls[-1].startswith(self.call_failure_prefixes):
+                return StringResult(result="CallOperator", reason="Fast path: the call to the expert was unsuccessful and has to be retried")
+            return None
+
+        # Browser test results and expert feedback need to be interpreted by the LLM
+        return None
+
+    @staticmethod
+    def _last_agent_message(chat_history: ChatHistory) -> ChatMessageContent | None:
+        for message in reversed(chat_history.messages):
+            if message.role == AuthorRole.ASSISTANT and message.name:
+                return message
+        return None
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+import sys
+import time
+
+
+class StartupProfile:
+    """Records the phases and milestones of the startup, relative to the creation of the profile.
+
+    Phases are timed blocks such as the import of a group of modules, milestones are points in time such as
+    the first prompt. The profile is created when the entry point module is imported, so the start of the
+    interpreter itself is not included; use python -X importtime for a per-module breakdown of the imports.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # Phases as (label, start, seconds) and milestones as (label, time), both relative to the start
+        self.phases: list[tuple[str, float, float]] = []
+        self.milestones: list[tuple[str, float]] = []
+        self.modules_at_start = len(sys.modules)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    @contextmanager
+    def phase(self, label: str):
+        started = self.elapsed()
+        try:
+            yield
+        finally:
+            self.phases.append((label, started, self.elapsed() - started))
+
+    def mark(self, label: str):
+        self.milestones.append((label, self.elapsed()))
+
+    def milestone(self, label: str) -> float | None:
+        return next((time for name, time in self.milestones if name == label), None)
+
+    def print_report(self):
+        print("**Startup Profile**:")
+        for label, started, seconds in self.phases:
+            print(f"-- {label}: {seconds:.2f}s (at {started:.2f}s)")
+        for label, time_since_start in self.milestones:
+            print(f"-- {label} at {time_since_start:.2f}s")
+        print(f"-- {len(sys.modules) - self.modules_at_start} modules imported since startup")
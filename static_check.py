@@ -0,0 +1,237 @@
+from dataclasses import dataclass
+from html.parser import HTMLParser
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+
+from semantic_kernel.contents import ChatMessageContent
+
+
+# Marks the report of the static check in the message after which it ran
+STATIC_CHECK_MARKER = "[Static check of the session directory:"
+STATIC_CHECK_FAILED = f"{STATIC_CHECK_MARKER} failed"
+
+CHECKED_EXTENSIONS = (".html", ".htm", ".css", ".js")
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Elements whose end tag may be omitted in HTML
+OPTIONAL_END_ELEMENTS = {"li", "p", "td", "th", "tr", "thead", "tbody", "tfoot", "option", "optgroup", "dt", "dd", "colgroup", "caption"}
+LABELLED_INPUT_TYPES_EXCLUDED = {"hidden", "submit", "reset", "button", "image"}
+EXTERNAL_REFERENCE_PATTERN = re.compile(r"^([a-z][a-z0-9+.-]*:|//|#)", re.IGNORECASE)
+
+
+@dataclass
+class Finding:
+    """A problem found by the static check."""
+
+    path: str
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"- {self.path}:{self.line}: {self.message}"
+
+
+class _HtmlChecker(HTMLParser):
+    """Collects the structure problems, references and unlabeled controls of an HTML file."""
+
+    def __init__(self, path: str):
+        super().__init__(convert_charrefs=True)
+        self.path = path
+        self.findings: list[Finding] = []
+        self.references: list[tuple[str, int]] = []
+        self._open: list[tuple[str, int]] = []
+        self._label_for: set[str] = set()
+        # Controls as (tag, id, line, inside label, has own label), buttons as [line, has label or text]
+        self._controls: list[tuple[str, str | None, int, bool, bool]] = []
+        self._buttons: list[list] = []
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        line = self.getpos()[0]
+
+        for name in ("href", "src"):
+            if attributes.get(name) and (tag != "a" or name != "href"):
+                self.references.append((attributes[name], line))
+
+        if tag == "label" and attributes.get("for"):
+            self._label_for.add(attributes["for"])
+        if tag == "img" and "alt" not in attributes:
+            self.findings.append(Finding(self.path, line, "<img> has no alt text"))
+        if tag in ("input", "select", "textarea") and attributes.get("type", "").lower() not in LABELLED_INPUT_TYPES_EXCLUDED:
+            has_label = any(attributes.get(name) for name in ("aria-label", "aria-labelledby", "title"))
+            inside_label = any(open_tag == "label" for open_tag, _ in self._open)
+            self._controls.append((tag, attributes.get("id"), line, inside_label, has_label))
+        if tag == "button":
+            self._buttons.append([line, bool(attributes.get("aria-label") or attributes.get("title"))])
+
+        if tag not in VOID_ELEMENTS:
+            self._open.append((tag, line))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self._open and self._open[-1][0] == tag:
+            self._open.pop()
+
+    def handle_data(self, data):
+        if data.strip() and self._buttons and any(open_tag == "button" for open_tag, _ in self._open):
+            self._buttons[-1][1] = True
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        line = self.getpos()[0]
+        if not any(open_tag == tag for open_tag, _ in self._open):
+            self.findings.append(Finding(self.path, line, f"</{tag}> has no matching start tag"))
+            return
+        while self._open:
+            open_tag, open_line = self._open.pop()
+            if open_tag == tag:
+                break
+            if open_tag not in OPTIONAL_END_ELEMENTS:
+                self.findings.append(Finding(self.path, open_line, f"<{open_tag}> is not closed before </{tag}>"))
+
+    def finish(self) -> list[Finding]:
+        self.close()
+        for open_tag, line in self._open:
+            if open_tag not in OPTIONAL_END_ELEMENTS | {"html", "body", "head"}:
+                self.findings.append(Finding(self.path, line, f"<{open_tag}> is never closed"))
+        for tag, element_id, line, inside_label, has_label in self._controls:
+            if not (inside_label or has_label or (element_id and element_id in self._label_for)):
+                self.findings.append(Finding(self.path, line, f"<{tag}> has no label"))
+        for line, has_label in self._buttons:
+            if not has_label:
+                self.findings.append(Finding(self.path, line, "<button> has no text or aria-label"))
+        return self.findings
+
+
+class StaticChecker:
+    """Checks the web app in the session directory without a browser.
+
+    HTML files are parsed and checked for unclosed tags, missing local assets and unlabeled controls,
+    JavaScript files are syntax checked with node, and all files are checked for non-ASCII characters and
+    unbalanced braces in CSS. Used as a response processor, the check runs whenever the files changed since
+    the last check and its report is appended to the message.
+    """
+
+    def __init__(self, session_dir: str, max_findings: int = 20, node_timeout: float = 10):
+        self.session_dir = session_dir
+        self.max_findings = max_findings
+        self.node_timeout = node_timeout
+        self.node = shutil.which("node")
+        self._last_hashes: dict[str, str] = {}
+
+    def _files(self) -> list[str]:
+        files = []
+        for root, dirs, names in os.walk(self.session_dir):
+            # Skip hidden directories such as the artifact store
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in names:
+                if name.lower().endswith(CHECKED_EXTENSIONS):
+                    files.append(os.path.relpath(os.path.join(root, name), self.session_dir).replace(os.sep, "/"))
+        return sorted(files)
+
+    def _hashes(self) -> dict[str, str]:
+        hashes = {}
+        for path in self._files():
+            with open(os.path.join(self.session_dir, path), "rb") as file:
+                hashes[path] = hashlib.sha256(file.read()).hexdigest()
+        return hashes
+
+    def _read(self, path: str) -> str:
+        with open(os.path.join(self.session_dir, path), "rb") as file:
+            return file.read().decode("utf-8", errors="replace")
+
+    def _check_html(self, path: str, text: str) -> list[Finding]:
+        checker = _HtmlChecker(path)
+        checker.feed(text)
+        findings = checker.finish()
+        base = os.path.dirname(path)
+        for reference, line in checker.references:
+            if EXTERNAL_REFERENCE_PATTERN.match(reference):
+                continue
+            target = os.path.normpath(os.path.join(base, reference.split("?")[0].split("#")[0]))
+            if not os.path.isfile(os.path.join(self.session_dir, target)):
+                findings.append(Finding(path, line, f"References {reference}, which does not exist"))
+        return findings
+
+    @staticmethod
+    def _check_css(path: str, text: str) -> list[Finding]:
+        depth = 0
+        for number, line in enumerate(re.sub(r"/\*.*?\*/", lambda match: "\n" * match.group(0).count("\n"), text, flags=re.DOTALL).splitlines(), 1):
+            depth += line.count("{") - line.count("}")
+            if depth < 0:
+                return [Finding(path, number, "Unexpected }")]
+        return [Finding(path, len(text.splitlines()), "Unclosed {")] if depth > 0 else []
+
+    async def _check_js(self, path: str) -> list[Finding]:
+        if not self.node:
+            return []
+        process = await asyncio.create_subprocess_exec(
+            self.node, "--check", os.path.join(self.session_dir, path),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), self.node_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            return []
+        if process.returncode == 0:
+            return []
+        output = stderr.decode("utf-8", errors="replace")
+        match = re.search(r":(\d+)\n", output)
+        error = next((line for line in output.splitlines() if "Error" in line), "Syntax error")
+        return [Finding(path, int(match.group(1)) if match else 1, error.strip())]
+
+    @staticmethod
+    def _check_ascii(path: str, text: str) -> list[Finding]:
+        for number, line in enumerate(text.splitlines(), 1):
+            characters = sorted({character for character in line if ord(character) > 127})
+            if characters:
+                return [Finding(path, number, f"Non-ASCII characters {' '.join(characters)} (first occurrence)")]
+        return []
+
+    async def check(self) -> list[Finding]:
+        """Check all files of the session directory."""
+        findings = []
+        js_checks = []
+        for path in self._files():
+            text = self._read(path)
+            findings += self._check_ascii(path, text)
+            if path.lower().endswith((".html", ".htm")):
+                findings += self._check_html(path, text)
+            elif path.lower().endswith(".css"):
+                findings += self._check_css(path, text)
+            elif path.lower().endswith(".js"):
+                js_checks.append(self._check_js(path))
+        for js_findings in await asyncio.gather(*js_checks):
+            findings += js_findings
+        return sorted(findings, key=lambda finding: (finding.path, finding.line))
+
+    def report(self, findings: list[Finding]) -> str:
+        if not findings:
+            checks = "HTML structure, asset references, labels, non-ASCII characters" + (", JavaScript syntax" if self.node else "")
+            return f"{STATIC_CHECK_MARKER} passed ({checks})]"
+        lines = [str(finding) for finding in findings[:self.max_findings]]
+        if len(findings) > self.max_findings:
+            lines.append(f"- ... and {len(findings) - self.max_findings} more")
+        return "\n".join([f"{STATIC_CHECK_FAILED} with {len(findings)} problems, fix them before testing in the browser:", *lines]) + "]"
+
+    async def process(self, message: ChatMessageContent) -> ChatMessageContent:
+        """Response processor that checks the session directory whenever its files changed."""
+        hashes = self._hashes()
+        if not hashes or hashes == self._last_hashes:
+            return message
+        self._last_hashes = hashes
+
+        findings = await self.check()
+        report = self.report(findings)
+        print(f"**Static Check**: {'passed' if not findings else f'{len(findings)} problems'} in {len(hashes)} files")
+        return ChatMessageContent(
+            role=message.role,
+            name=message.name,
+            content=f"{message.content or ''}\n\n{report}",
+            metadata=message.metadata,
+        )
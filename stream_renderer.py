@@ -0,0 +1,124 @@
+import asyncio
+import sys
+from typing import TextIO
+
+from semantic_kernel.contents import StreamingChatMessageContent
+
+
+class StreamRenderer:
+    """Renders the streamed responses of the agents without blocking the orchestration on the terminal.
+
+    Formatted chunks are coalesced into batches, which an output task writes once they reach max_batch_chars
+    or no batch was written for flush_interval seconds. The end of each response is waited for, so that it is
+    not interleaved with the output that follows it. Each renderer keeps its own state, so several sessions can
+    render at the same time. In quiet mode, nothing is rendered.
+    """
+
+    reset_color = "\033[0m"
+    default_color = "\033[37m"
+
+    def __init__(
+        self,
+        agent_colors: dict[str, str] | None = None,
+        stream: TextIO | None = None,
+        flush_interval: float = 0.05,
+        max_batch_chars: int = 2048,
+        max_result_chars: int = 100,
+        quiet: bool = False,
+    ):
+        self.agent_colors = agent_colors if agent_colors is not None else {}
+        self.stream = stream or sys.stdout
+        self.flush_interval = flush_interval
+        self.max_batch_chars = max_batch_chars
+        self.max_result_chars = max_result_chars
+        self.quiet = quiet
+        # Number of writes to the stream
+        self.batches = 0
+
+        self._current_agent: str | None = None
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._queue: asyncio.Queue[str | None] | None = None
+        self._writer: asyncio.Task | None = None
+
+    def _format(self, message: StreamingChatMessageContent, is_last: bool) -> str:
+        """Format a chunk of a response, with a header when a new agent starts to respond."""
+        color = self.agent_colors.get(message.name, self.default_color) if message.name else self.default_color
+        parts = []
+
+        if message.name and message.name != self._current_agent:
+            parts.append(f"\n{color}**{message.name}**: ")
+            self._current_agent = message.name
+
+        if message.content:
+            parts.append(f"{color}{message.content}{self.reset_color}")
+
+        for item in message.items:
+            if item.content_type == 'function_call':
+                parts.append(f"\n{color}-- Calling function {item.name} with arguments {item.arguments}{self.reset_color}")
+            elif item.content_type == 'function_result':
+                result_str = str(item.result)
+                if len(result_str) > self.max_result_chars:
+                    result_str = result_str[:self.max_result_chars] + "..."
+                parts.append(f"\n{color}Function {item.name} returned {result_str}{self.reset_color}")
+
+        if is_last:
+            parts.append(f"\n{self.reset_color}" + "─" * 50 + "\n")
+            self._current_agent = None
+
+        return "".join(parts)
+
+    def _take(self) -> str:
+        batch = "".join(self._pending)
+        self._pending, self._pending_chars = [], 0
+        return batch
+
+    def _write(self, batch: str):
+        self.stream.write(batch)
+        self.stream.flush()
+        self.batches += 1
+
+    async def _write_batches(self):
+        """Output task that writes the batches in order, off the event loop."""
+        while True:
+            try:
+                batch = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                # Write what has accumulated so far, so that slow streams still show progress
+                batch = self._take()
+                if batch:
+                    await asyncio.to_thread(self._write, batch)
+                continue
+
+            if batch is None:
+                self._queue.task_done()
+                return
+            await asyncio.to_thread(self._write, batch)
+            self._queue.task_done()
+
+    async def render(self, message: StreamingChatMessageContent, is_last: bool) -> None:
+        """Streaming agent response callback."""
+        if self.quiet:
+            return
+        if self._writer is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._write_batches())
+
+        text = self._format(message, is_last)
+        self._pending.append(text)
+        self._pending_chars += len(text)
+
+        if is_last or self._pending_chars >= self.max_batch_chars:
+            self._queue.put_nowait(self._take())
+        if is_last:
+            await self._queue.join()
+
+    async def close(self):
+        """Write the remaining output and stop the output task."""
+        if self._writer is None:
+            return
+        if self._pending:
+            self._queue.put_nowait(self._take())
+        self._queue.put_nowait(None)
+        await self._writer
+        self._writer = None
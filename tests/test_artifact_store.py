@@ -0,0 +1,41 @@
+import asyncio
+
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from artifact_store import HANDLE_PATTERN, ArtifactStore
+
+
+def handle_names(text: str, tmp_path) -> list[str]:
+    new_text, _ = ArtifactStore(str(tmp_path)).replace_code_blocks(text)
+    return [match.group("name") for match in HANDLE_PATTERN.finditer(new_text)]
+
+
+def test_patch_handles_are_marked_as_patches(tmp_path):
+    text = "Here is the change to script.js:\n```diff\n--- a/script.js\n+++ b/script.js\n@@ -1 +1 @@\n-a();\n+b();\n```"
+    assert handle_names(text, tmp_path) == ["script.js.diff"]
+    assert handle_names("```patch\n--- a/x.css\n+++ b/x.css\n```", tmp_path) == ["patch1.patch"]
+
+
+def test_patch_handles_resolve_to_the_diff(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    diff = "--- a/script.js\n+++ b/script.js\n@@ -1 +1 @@\n-a();\n+b();\n"
+    new_text, _ = store.replace_code_blocks(f"script.js:\n```diff\n{diff}```")
+    assert store.resolve(new_text) == f"script.js:\n{diff}"
+
+
+def test_files_keep_their_names(tmp_path):
+    assert handle_names("index.html:\n```html\n<html></html>\n```\n```js script.js\nrun();\n```", tmp_path) == ["index.html", "script.js"]
+
+
+def test_snippets_named_only_by_their_language_get_snippet_names(tmp_path):
+    text = "Change the button color:\n```css\nbutton { color: red; }\n```\n```html\n<!DOCTYPE html>\n<html></html>\n```"
+    assert handle_names(text, tmp_path) == ["snippet1.css", "index.html"]
+
+
+def test_only_developer_messages_are_processed(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    content = "Test failed:\n```\n" + "TypeError: reset is not a function\n" * 5 + "```"
+    message = ChatMessageContent(role=AuthorRole.ASSISTANT, name="QualityAssurance", content=content)
+    assert asyncio.run(store.process(message)).content == content
+    message = ChatMessageContent(role=AuthorRole.ASSISTANT, name="Developer", content=content)
+    assert HANDLE_PATTERN.search(asyncio.run(store.process(message)).content)
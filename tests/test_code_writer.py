@@ -0,0 +1,19 @@
+from code_writer import CodeWriter
+
+
+def files(text: str):
+    return CodeWriter(file_plugin=None)._files(text)
+
+
+def test_snippet_named_only_by_its_language_is_left_to_the_file_manager():
+    assert files("Change the button color:\n```css\nbutton { color: red; }\n```") is None
+    assert files("```javascript\nfunction reset() {}\n```") is None
+
+
+def test_full_html_document_named_by_its_language_is_written():
+    assert files("```html\n<!DOCTYPE html>\n<html></html>\n```") == ({"index.html": "<!DOCTYPE html>\n<html></html>\n"}, [])
+
+
+def test_blocks_with_explicit_file_names_are_written():
+    text = "styles.css:\n```css\nbody {}\n```\n```javascript script.js\nrun();\n```"
+    assert files(text) == ({"styles.css": "body {}\n", "script.js": "run();\n"}, [])
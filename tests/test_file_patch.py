@@ -0,0 +1,78 @@
+import pytest
+
+from file_patch import PatchConflictError, apply_file_patch, parse_unified_diff
+
+
+def apply(text: str, patch: str) -> str:
+    (file_patch,) = parse_unified_diff(patch)
+    return apply_file_patch(text, file_patch)
+
+
+def test_insertion_goes_after_the_given_line():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -2,0 +3,1 @@\n+inserted\n"
+    assert apply("one\ntwo\nthree\n", patch) == "one\ntwo\ninserted\nthree\n"
+
+
+def test_insertion_at_the_start_of_the_file():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -0,0 +1,1 @@\n+first\n"
+    assert apply("one\ntwo\n", patch) == "first\none\ntwo\n"
+
+
+def test_deletion():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -1,3 +1,2 @@\n one\n-two\n three\n"
+    assert apply("one\ntwo\nthree\n", patch) == "one\nthree\n"
+
+
+def test_removed_line_that_looks_like_a_file_header():
+    patch = "--- a/f.sql\n+++ b/f.sql\n@@ -1,2 +1,1 @@\n select 1;\n--- comment\n"
+    assert apply("select 1;\n-- comment\n", patch) == "select 1;\n"
+
+
+def test_multiple_hunks_with_shifted_offsets():
+    text = "".join(f"line {number}\n" for number in range(1, 11))
+    patch = (
+        "--- a/f.txt\n+++ b/f.txt\n"
+        # Adds two lines, so the second hunk starts two lines later than its header says
+        "@@ -2,1 +2,3 @@\n line 2\n+new a\n+new b\n"
+        "@@ -7,0 +10,1 @@\n+after 7\n"
+        "@@ -9,2 +12,1 @@\n-line 9\n line 10\n"
+    )
+    expected = text.replace("line 2\n", "line 2\nnew a\nnew b\n").replace("line 7\n", "line 7\nafter 7\n").replace("line 9\n", "")
+    assert apply(text, patch) == expected
+
+
+def test_hunk_found_when_the_line_numbers_are_off():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -1,2 +1,2 @@\n c\n-d\n+D\n"
+    assert apply("a\nb\nc\nd\n", patch) == "a\nb\nc\nD\n"
+
+
+def test_whitespace_tolerant_matching():
+    # Trailing whitespace is ignored when matching, the lines of the hunk are written as in the patch
+    patch = "--- a/f.js\n+++ b/f.js\n@@ -1,2 +1,2 @@\n function f() {\n-  return 1;\n+  return 2;\n"
+    assert apply("function f() {   \n  return 1;\t\n}\n", patch) == "function f() {\n  return 2;\n}\n"
+
+
+def test_mismatched_context_raises():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -1,1 +1,1 @@\n-missing\n+other\n"
+    with pytest.raises(PatchConflictError):
+        apply("one\n", patch)
+
+
+def test_truncated_hunk_raises():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -1,3 +1,3 @@\n one\n-two\n+TWO\n"
+    with pytest.raises(PatchConflictError):
+        parse_unified_diff(patch)
+
+
+def test_hunk_with_more_lines_than_announced_raises():
+    patch = "--- a/f.txt\n+++ b/f.txt\n@@ -1,1 +1,1 @@\n-one\n+ONE\n+extra\n"
+    with pytest.raises(PatchConflictError):
+        parse_unified_diff(patch)
+
+
+def test_multiple_files():
+    patch = "--- a/a.txt\n+++ b/a.txt\n@@ -1 +1 @@\n-a\n+A\n--- /dev/null\n+++ b/b.txt\n@@ -0,0 +1,1 @@\n+b\n"
+    first, second = parse_unified_diff(patch)
+    assert (first.path, second.path, second.is_new_file) == ("a.txt", "b.txt", True)
+    assert apply_file_patch("a\n", first) == "A\n"
+    assert apply_file_patch("", second) == "b\n"
@@ -0,0 +1,22 @@
+import os
+import stat
+
+from plugins.file_plugin import UMASK, FilePlugin
+
+
+def mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_get_the_default_mode(tmp_path):
+    FilePlugin(base_dir=str(tmp_path)).create_file(content="<html></html>", path="index.html")
+    assert mode(tmp_path / "index.html") == 0o666 & ~UMASK
+
+
+def test_changed_files_keep_their_mode(tmp_path):
+    path = tmp_path / "script.js"
+    path.write_text("a();")
+    os.chmod(path, 0o644)
+    FilePlugin(base_dir=str(tmp_path)).create_file(content="b();", path="script.js")
+    assert path.read_text() == "b();"
+    assert mode(path) == 0o644
@@ -0,0 +1,177 @@
+from typing import override
+
+from semantic_kernel.agents.orchestration.agent_actor_base import ActorBase
+from semantic_kernel.agents.orchestration.group_chat import (
+    GroupChatManager,
+    GroupChatManagerActor,
+    GroupChatRequestMessage,
+    GroupChatResponseMessage,
+)
+from semantic_kernel.agents.runtime.core.cancellation_token import CancellationToken
+from semantic_kernel.agents.runtime.core.message_context import MessageContext
+from semantic_kernel.agents.runtime.core.routed_agent import message_handler
+from semantic_kernel.agents.runtime.core.topic import TopicId
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+
+# The steps of the app factory workflow and the steps whose output they need
+DEFAULT_DEPENDENCIES: dict[str, list[str]] = {
+    "Developer": [],
+    "FileManager": ["Developer"],
+    "QualityAssurance": ["FileManager"],
+    "CallOperator": ["FileManager"],
+}
+
+
+class WorkflowGraph:
+    """The dependencies between the steps of the workflow, with one step per agent.
+
+    Dependencies on agents that are not part of the group chat are replaced by their own dependencies, e.g. the
+    saved files come from the Developer if the FileManager is left out because code is saved directly.
+    """
+
+    def __init__(self, dependencies: dict[str, list[str]] | None = None):
+        self.dependencies = dependencies if dependencies is not None else DEFAULT_DEPENDENCIES
+
+    def resolve(self, participants: list[str]) -> dict[str, set[str]]:
+        """Get the direct dependencies of each participant among the participants."""
+        def resolve_step(step: str, seen: set[str]) -> set[str]:
+            resolved = set()
+            for dependency in self.dependencies.get(step, []):
+                if dependency in seen:
+                    continue
+                if dependency in participants:
+                    resolved.add(dependency)
+                else:
+                    resolved |= resolve_step(dependency, seen | {dependency})
+            return resolved
+
+        return {participant: resolve_step(participant, {participant}) for participant in participants}
+
+    @staticmethod
+    def depends_on(dependencies: dict[str, set[str]], step: str, other: str) -> bool:
+        """Whether a step needs the output of the other step, directly or indirectly."""
+        pending, seen = list(dependencies.get(step, [])), set()
+        while pending:
+            dependency = pending.pop()
+            if dependency == other:
+                return True
+            if dependency not in seen:
+                seen.add(dependency)
+                pending.extend(dependencies.get(dependency, []))
+        return False
+
+
+class ParallelGroupChatManagerActor(GroupChatManagerActor):
+    """A group chat manager actor that runs independent steps of the workflow at the same time.
+
+    The chat manager still selects one agent per round. Other agents that do not depend on the selected agent
+    or on each other, whose dependencies have responded and that have not responded since then, are requested
+    at the same time. Once all of them responded, their responses are added to the chat history in the order
+    of the participants and the chat manager takes over again.
+    """
+
+    def __init__(
+        self,
+        manager: GroupChatManager,
+        internal_topic_type: str,
+        participant_descriptions: dict[str, str],
+        workflow_graph: WorkflowGraph,
+        **kwargs,
+    ):
+        super().__init__(manager, internal_topic_type, participant_descriptions, **kwargs)
+        self._participants = list(participant_descriptions)
+        self._dependencies = workflow_graph.resolve(self._participants)
+        # Number of responses so far and the number at the last response of each agent
+        self._responses = 0
+        self._last_responses: dict[str, int] = {}
+        # Responses of the running parallel group by agent name, None until the agent responded
+        self._group: dict[str, ChatMessageContent | None] = {}
+
+    def _is_stale(self, step: str) -> bool:
+        """Whether all dependencies of a step responded and the step has not responded since."""
+        dependencies = self._dependencies.get(step, set())
+        if not all(dependency in self._last_responses for dependency in dependencies):
+            return False
+        if step not in self._last_responses:
+            return True
+        return self._last_responses[step] < max((self._last_responses[dependency] for dependency in dependencies), default=0)
+
+    def _parallel_group(self, selected: str) -> list[str]:
+        """Get the selected agent and the independent agents that can run with it, in participant order."""
+        if selected not in self._dependencies or not self._dependencies[selected]:
+            return [selected]
+        group = [selected]
+        for step in self._participants:
+            if step in group or not self._is_stale(step):
+                continue
+            if any(WorkflowGraph.depends_on(self._dependencies, step, other) or WorkflowGraph.depends_on(self._dependencies, other, step) for other in group):
+                continue
+            group.append(step)
+        return sorted(group, key=self._participants.index)
+
+    def _add_response(self, message: ChatMessageContent):
+        if message.role != AuthorRole.USER:
+            self._chat_history.add_message(
+                ChatMessageContent(role=AuthorRole.USER, content=f"Transferred to {message.name}")
+            )
+        self._chat_history.add_message(message)
+        self._responses += 1
+        if message.name:
+            self._last_responses[message.name] = self._responses
+
+    @message_handler
+    async def _handle_response_message(self, message: GroupChatResponseMessage, ctx: MessageContext) -> None:
+        if message.body.name in self._group and self._group[message.body.name] is None:
+            self._group[message.body.name] = message.body
+            if any(response is None for response in self._group.values()):
+                return
+            # Merge in a fixed order, independent of which agent finished first
+            group, self._group = self._group, {}
+            for response in group.values():
+                self._add_response(response)
+        else:
+            self._add_response(message.body)
+
+        await self._determine_state_and_take_action(ctx.cancellation_token)
+
+    @override
+    @ActorBase.exception_handler
+    async def _determine_state_and_take_action(self, cancellation_token: CancellationToken) -> None:
+        """Determine the state of the group chat and request the selected agent and the agents that can run with it."""
+        should_request_user_input = await self._manager.should_request_user_input(
+            self._chat_history.model_copy(deep=True)
+        )
+        if should_request_user_input.result and self._manager.human_response_function:
+            user_input_message = await self._call_human_response_function()
+            self._chat_history.add_message(user_input_message)
+            await self.publish_message(
+                GroupChatResponseMessage(body=user_input_message),
+                TopicId(self._internal_topic_type, self.id.key),
+                cancellation_token=cancellation_token,
+            )
+
+        should_terminate = await self._manager.should_terminate(self._chat_history.model_copy(deep=True))
+        if should_terminate.result:
+            if self._result_callback:
+                result = await self._manager.filter_results(self._chat_history.model_copy(deep=True))
+                result.result.metadata["termination_reason"] = should_terminate.reason
+                result.result.metadata["filter_result_reason"] = result.reason
+                await self._result_callback(result.result)
+            return
+
+        next_agent = await self._manager.select_next_agent(
+            self._chat_history.model_copy(deep=True),
+            self._participant_descriptions,
+        )
+
+        group = self._parallel_group(next_agent.result)
+        if len(group) > 1:
+            print(f"**Chat Manager**:\n-- Running in parallel: {', '.join(group)}.")
+            self._group = {name: None for name in group}
+        for name in group:
+            await self.publish_message(
+                GroupChatRequestMessage(agent_name=name),
+                TopicId(self._internal_topic_type, self.id.key),
+                cancellation_token=cancellation_token,
+            )